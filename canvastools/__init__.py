@@ -0,0 +1,11 @@
+"""
+canvastools
+
+Tools to automate grading and submission of grades for student
+assignments associated with Canvas LMS courses.
+
+    Run as   canvastools <subcommand> [options]   (or python3 -m canvastools).
+    See canvastools.cli for the list of subcommands.
+
+"""
+__version__ = '0.5.0'
@@ -0,0 +1,3 @@
+from canvastools.cli import main
+
+main()
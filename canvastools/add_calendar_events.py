@@ -16,7 +16,7 @@ add_calendar_events.py
 import sys
 import argparse
 
-import requests
+from .canvas_client import CanvasClient, read_token, resolve_base_url
 
 
 def main():
@@ -28,6 +28,9 @@ def main():
     parser.add_argument('--token_file',
                         help='Canvas Access Token File',
                         required=True)
+    parser.add_argument('--canvas_url',
+                        help='Canvas base URL (default: https://ufl.instructure.com)',
+                        default=None)
     parser.add_argument('--event_file',
                         help='File containing lines of tab-separated event_name and ISO 8601 date',
                         required=True)
@@ -49,19 +52,16 @@ def main():
 
     # Get token
     try:
-        with open(args.token_file) as f:
-            access_token = f.readline()
-            f.close()
+        access_token = read_token(args.token_file)
     except Exception as err:
         print(f"Couldn't read access token file {args.token_file}\n   {str(err)}",
               file=sys.stderr,
               flush=True)
         exit(2)
     # noinspection PyUnboundLocalVariable
-    headers = {'Content-Type': 'application/json',
-               'Authorization': 'Bearer ' + access_token.rstrip()}
+    canvas = CanvasClient(access_token, base_url=resolve_base_url(args.canvas_url))
 
-    print(f'headers is [{headers}]')
+    print(f'Canvas API is [{canvas.api_base}]')
     # Get events
     try:
         with open(args.event_file) as f:
@@ -72,13 +72,12 @@ def main():
               flush=True)
         exit(3)
 
-    calendar_uri = 'https://ufl.instructure.com/api/v1/calendar_events/'
+    calendar_uri = f'{canvas.api_base}calendar_events/'
     for (event, date) in events:
         try:
             print(f'Post request for [{event}]: [{date}]')
-            post_response = requests.post(url=calendar_uri,
-                                          headers=headers,
-                                          params={'calendar_event[context_code]': f'course_{args.course_id}',
+            post_response = canvas.post(calendar_uri,
+                                        params={'calendar_event[context_code]': f'course_{args.course_id}',
                                                   'calendar_event[title]': f'{event}',
                                                   'calendar_event[start_at]': f'{date}',
                                                   'calendar_event[end_at]': f'{date}'})
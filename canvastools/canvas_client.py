@@ -0,0 +1,356 @@
+#! /usr/bin/env python3
+"""
+canvas_client.py
+
+Shared Canvas REST API client used by the CanvasTools scripts.
+
+    Every script used to call requests.get/put/post directly, which opens a
+    fresh TLS connection for every request.  CanvasClient keeps one
+    keep-alive requests.Session per host instead:
+
+        api_session     Canvas API host (carries the Authorization header)
+        upload_session  file upload host returned by Canvas in upload_url
+                        (never sees the Canvas API token)
+
+    Rate limiting
+        Canvas charges each API request against a per-token cost bucket and
+        reports the balance in the X-Rate-Limit-Remaining header.  Every API
+        request goes through a RateLimitScheduler that lowers the number of
+        requests in flight when the bucket runs low and raises it again when
+        there is room.  Throttled (403 Rate Limit Exceeded / 429) requests
+        are retried with jittered exponential backoff, as are 5xx responses
+        and dropped connections for idempotent requests.  A PUT that adds a
+        comment is not idempotent (a retry after Canvas applied it posts the
+        comment twice), so those calls pass idempotent=False.
+
+    Timeouts
+        Every request and upload has a (connect, read) timeout
+        (Default_Timeout, or timeout= per call), so a stalled connection
+        fails and is retried instead of holding its scheduler slot forever.
+
+    Pagination
+        CanvasClient.paginate() is a generator over the records of a list
+        endpoint.  It follows the Link header page by page, and when the
+        last page number is known up front it fetches up to Prefetch_Pages
+        later pages in parallel while earlier ones are being consumed.
+
+    Caching
+        Pass cache=ResponseCache() (see response_cache.py) to keep slow-moving
+        metadata such as assignment lists and quiz questions on disk between
+        runs and revalidate it by ETag.
+
+    Base URL
+        Defaults to Default_Base_URL.  Overridden (lowest to highest priority)
+        by the CANVAS_BASE_URL environment variable, a "canvas_url" entry in
+        the config file, or the --canvas_url command line flag.
+
+    API_token file
+        Canvas API token is stored in a file (default name: API_token)
+
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+Default_Base_URL = 'https://ufl.instructure.com'
+Pool_Size = 16
+Progress_Poll_Interval = 1.0
+
+# Canvas caps per_page (usually at 100); asking for more is silently truncated
+Per_Page = 100
+Prefetch_Pages = 4
+
+Max_Retries = 5
+Backoff_Base = 1.0
+Backoff_Max = 60.0
+Retry_Status = (500, 502, 503, 504)
+Idempotent_Methods = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+# (connect, read) seconds
+Default_Timeout = (10.0, 120.0)
+
+# X-Rate-Limit-Remaining thresholds (Canvas buckets start at 700)
+Rate_Limit_Low_Water = 200.0
+Rate_Limit_High_Water = 500.0
+
+
+def read_token(token_file):
+    """Return the Canvas API token stored on the first line of token_file"""
+    with open(token_file) as f:
+        return f.readline().rstrip()
+
+
+def resolve_base_url(canvas_url=None, config=None):
+    """Pick the Canvas base URL from the command line, config file or environment"""
+    if canvas_url:
+        return canvas_url
+    if config and 'canvas_url' in config.keys():
+        return config['canvas_url']
+    return os.environ.get('CANVAS_BASE_URL', Default_Base_URL)
+
+
+def is_throttled(response):
+    """True if Canvas refused response because the rate limit bucket is empty"""
+    return response.status_code == 429 or \
+        (response.status_code == 403 and 'Rate Limit Exceeded' in response.text)
+
+
+def backoff_delay(retry, response=None):
+    """Seconds to wait before retry number retry (0-based), with full jitter"""
+    if response is not None and 'Retry-After' in response.headers:
+        try:
+            return float(response.headers['Retry-After'])
+        except ValueError:
+            pass
+    return random.uniform(0, min(Backoff_Max, Backoff_Base * 2 ** retry))
+
+
+class RateLimitScheduler:
+    """Adaptive limit on the number of API requests in flight
+
+    The limit is halved whenever Canvas throttles a request or the remaining
+    budget drops below what the requests in flight are expected to cost plus
+    low_water, and grows by one for each response that leaves more than
+    high_water in the bucket.
+    """
+
+    def __init__(self, max_concurrency=Pool_Size,
+                 low_water=Rate_Limit_Low_Water, high_water=Rate_Limit_High_Water):
+        self.max_concurrency = max_concurrency
+        self.low_water = low_water
+        self.high_water = high_water
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.remaining = None
+        self.cost = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, response=None):
+        with self.condition:
+            self.in_flight -= 1
+            if response is not None:
+                self.update(response)
+            self.condition.notify_all()
+
+    def update(self, response):
+        """Adjust the limit from one response's rate limit headers (lock held)"""
+        try:
+            self.cost = float(response.headers.get('X-Request-Cost', self.cost))
+            if 'X-Rate-Limit-Remaining' in response.headers:
+                self.remaining = float(response.headers['X-Rate-Limit-Remaining'])
+        except ValueError:
+            pass
+
+        if is_throttled(response) or \
+                (self.remaining is not None and
+                 self.remaining < self.low_water + self.cost * self.in_flight):
+            self.limit = max(1, self.limit // 2)
+        elif self.remaining is None or self.remaining > self.high_water:
+            self.limit = min(self.max_concurrency, self.limit + 1)
+
+
+def page_number(url):
+    """Numeric page parameter of a Link header url, or None (e.g. bookmark pages)"""
+    page = parse_qs(urlparse(url).query).get('page', [''])[0]
+    return int(page) if page.isdigit() else None
+
+
+def with_page(url, page):
+    """url with its page parameter replaced by page"""
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    query['page'] = [str(page)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def page_records(response, key=None):
+    """Records in one page; key selects the list in endpoints that wrap it (e.g. quiz_submissions)"""
+    response.raise_for_status()
+    data = response.json()
+    return data[key] if key else data
+
+
+def make_session(pool_size=Pool_Size):
+    """Create a keep-alive session with a connection pool of pool_size"""
+    # requests is imported on first use so that --help and dry argument
+    # errors don't pay for it
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class CanvasClient:
+    """Pooled connections to one Canvas instance"""
+
+    def __init__(self, access_token, base_url=Default_Base_URL, pool_size=Pool_Size,
+                 max_retries=Max_Retries, cache=None, timeout=Default_Timeout):
+        self.base_url = base_url.rstrip('/')
+        self.api_base = f'{self.base_url}/api/v1/'
+
+        self.api_session = make_session(pool_size)
+        self.api_session.headers.update({'Authorization': f'Bearer {access_token}'})
+
+        self.upload_session = make_session(pool_size)
+
+        import requests
+        self.transient_errors = (requests.ConnectionError, requests.Timeout)
+        self.scheduler = RateLimitScheduler(max_concurrency=pool_size)
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        # optional ResponseCache; entries are kept apart per token
+        self.cache = cache
+        self.cache_namespace = hashlib.sha256(access_token.encode()).hexdigest()[:16]
+
+    def url(self, path):
+        """Absolute URL for path; relative paths are taken from api_base"""
+        if path.startswith('https://') or path.startswith('http://'):
+            return path
+        return self.api_base + path.lstrip('/')
+
+    def should_retry(self, idempotent, response):
+        return is_throttled(response) or \
+            (response.status_code in Retry_Status and idempotent)
+
+    def request(self, method, path, idempotent=None, **kwargs):
+        """Send an API request through the scheduler, retrying throttled and transient failures
+
+        5xx responses and dropped connections are only retried for
+        idempotent requests: by default those whose method is in
+        Idempotent_Methods, idempotent=False opts a call out.
+        """
+        url = self.url(path)
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in Idempotent_Methods
+        kwargs.setdefault('timeout', self.timeout)
+        retry = 0
+        while True:
+            response = None
+            self.scheduler.acquire()
+            try:
+                response = self.api_session.request(method, url, **kwargs)
+            except self.transient_errors:
+                if not idempotent or retry >= self.max_retries:
+                    raise
+            finally:
+                self.scheduler.release(response)
+
+            if response is not None and (retry >= self.max_retries or not self.should_retry(idempotent, response)):
+                return response
+            time.sleep(backoff_delay(retry, response))
+            retry += 1
+
+    def get(self, path, params=None, **kwargs):
+        if self.cache is None:
+            return self.request('GET', path, params=params, **kwargs)
+
+        ##
+        # Serve fresh entries from the cache, revalidate stale ones by ETag
+        url = self.url(path)
+        ttl = self.cache.ttl(url)
+        if ttl is None:
+            return self.request('GET', url, params=params, **kwargs)
+        entry = self.cache.lookup(self.cache_namespace, url, params)
+        if entry is not None and self.cache.is_fresh(entry, ttl):
+            return self.cache.response(entry)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None and 'ETag' in entry['headers']:
+            headers['If-None-Match'] = entry['headers']['ETag']
+        response = self.request('GET', url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.refresh(self.cache_namespace, url, params, entry)
+            return self.cache.response(entry)
+        if response.status_code == 200:
+            self.cache.store(self.cache_namespace, url, params, response)
+        return response
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def paginate(self, path, params=None, key=None, per_page=Per_Page, prefetch=Prefetch_Pages):
+        """Yield every record of a paginated list endpoint as its pages arrive"""
+        params = dict(params or {})
+        params.setdefault('per_page', str(per_page))
+        response = self.get(path, params=params)
+        yield from page_records(response, key)
+
+        next_url = response.links.get('next', {}).get('url')
+        last_url = response.links.get('last', {}).get('url')
+        if not next_url:
+            return
+        next_page = page_number(next_url)
+        last_page = page_number(last_url) if last_url else None
+
+        if prefetch > 1 and next_page is not None and last_page is not None:
+            ##
+            # Page numbers are predictable: keep up to prefetch pages in flight
+            pages = iter(range(next_page, last_page + 1))
+            with ThreadPoolExecutor(max_workers=prefetch) as pool:
+                pending = deque(pool.submit(self.get, with_page(next_url, page))
+                                for page in islice(pages, prefetch))
+                while pending:
+                    response = pending.popleft().result()
+                    page = next(pages, None)
+                    if page is not None:
+                        pending.append(pool.submit(self.get, with_page(next_url, page)))
+                    yield from page_records(response, key)
+            return
+
+        ##
+        # Opaque (bookmark) pages: follow next links one at a time
+        while next_url:
+            response = self.get(next_url)
+            yield from page_records(response, key)
+            next_url = response.links.get('next', {}).get('url')
+
+    def upload(self, upload_url, **kwargs):
+        """POST a file body to an upload_url handed out by Canvas"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.upload_session.post(upload_url, **kwargs)
+
+    def wait_for_progress(self, progress, interval=Progress_Poll_Interval, timeout=600):
+        """Poll a Canvas Progress object until it is completed or failed"""
+        deadline = time.monotonic() + timeout
+        while progress['workflow_state'] not in ('completed', 'failed'):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Progress {progress["id"]} still {progress["workflow_state"]} after {timeout}s')
+            time.sleep(interval)
+            response = self.get(progress['url'])
+            response.raise_for_status()
+            progress = response.json()
+        return progress
+
+    def close(self):
+        self.api_session.close()
+        self.upload_session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
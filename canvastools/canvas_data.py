@@ -0,0 +1,279 @@
+#! /usr/bin/env python3
+"""
+canvas_data.py
+
+Reading assignments and submissions for copy_rubric and submit_assignment.
+
+    Two interchangeable backends (--api) return the same REST-shaped
+    dictionaries:
+
+        rest      the REST list endpoints, page by page (CanvasClient.paginate)
+        graphql   Canvas GraphQL (/api/graphql): users, submissions, attempts
+                  and comment attachments come back together, 100 per query,
+                  following the connections' cursors; the assignment lists
+                  of all sections are asked for in one query
+
+    Only what the scripts use is converted: assignment id, name and
+    quiz_id; submission id, user_id, attempt, workflow_state, submitted_at,
+    score, entered_score, grade_matches_current_submission, user (id,
+    sortable_name) and the submission_comments of every attempt (attempt,
+    attachments id, display_name, size).
+
+    GraphQL gives an attachment's size only as text ("12.5 KB"), so that
+    is what size holds there; compare sizes with size_matches().
+
+"""
+import datetime
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+Backends = ('rest', 'graphql')
+Page_Size = 100
+
+Assignment_Fields = '''
+    nodes { _id name quiz { _id } }
+    pageInfo { hasNextPage endCursor }
+'''
+
+Assignments_Query = '''
+query Assignments($courseId: ID!, $after: String) {
+  course(id: $courseId) {
+    assignmentsConnection(first: %d, after: $after) { %s }
+  }
+}
+''' % (Page_Size, Assignment_Fields)
+
+Submissions_Query = '''
+query Submissions($assignmentId: ID!, $after: String, $withUser: Boolean!, $withComments: Boolean!) {
+  assignment(id: $assignmentId) {
+    submissionsConnection(first: %d, after: $after,
+                          filter: {states: [unsubmitted, submitted, pending_review, graded]}) {
+      nodes {
+        _id userId attempt state submittedAt score enteredScore gradeMatchesCurrentSubmission
+        user @include(if: $withUser) { _id sortableName }
+        commentsConnection(filter: {allComments: true}) @include(if: $withComments) {
+          nodes { attempt attachments { _id displayName size } }
+        }
+      }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+''' % Page_Size
+
+
+def parse_time(timestamp):
+    """Aware datetime for an ISO 8601 time (local time if it has no zone)"""
+    when = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return when if when.tzinfo is not None else when.astimezone()
+
+
+def size_matches(reported, size):
+    """True if an attachment size as Canvas reported it can be size bytes
+
+    REST reports bytes; GraphQL a rounded human-readable size such as
+    "12.5 KB" (1024-based, three significant digits), which matches any
+    size that rounds to it.  A missing or unreadable size never matches.
+    """
+    if isinstance(reported, int):
+        return reported == size
+    m = re.fullmatch(r'\s*([\d.]+)\s*(bytes?|[KMGT]B)\s*', str(reported or ''), re.IGNORECASE)
+    if not m:
+        return False
+    value = float(m[1])
+    if m[2].lower().startswith('byte'):
+        return value == size
+    unit = 1024 ** ('KMGT'.index(m[2][0].upper()) + 1)
+    decimals = len(m[1].partition('.')[2])
+    # half of the last digit shown or of the third significant digit
+    tolerance = max(0.5 * 10 ** -decimals if decimals else 0,
+                    0.5 * 10 ** (math.floor(math.log10(value)) - 2) if value > 0 else 0)
+    return abs(size / unit - value) <= tolerance
+
+
+def match_assignment(assignments, quiz_or_assignment_id):
+    """The assignment whose quiz id is quiz_or_assignment_id, else the one with that id, else None"""
+    quiz_or_assignment_id = str(quiz_or_assignment_id)
+    asst_entry = []
+    id_entry = []
+    for x in assignments:
+        if 'quiz_id' in x and str(x['quiz_id']) == quiz_or_assignment_id:
+            asst_entry.append(x)
+        elif 'id' in x and str(x['id']) == quiz_or_assignment_id:
+            id_entry.append(x)
+    matches = asst_entry or id_entry
+    return matches[0] if matches else None
+
+
+class RestBackend:
+    """Assignments and submissions from the REST list endpoints"""
+    name = 'rest'
+
+    def __init__(self, canvas, jobs=8):
+        self.canvas = canvas
+        self.jobs = jobs
+
+    def find_assignment(self, course_id, quiz_or_assignment_id):
+        # One streaming pass over the assignments
+        return match_assignment(self.canvas.paginate(f'courses/{course_id}/assignments'), quiz_or_assignment_id)
+
+    def find_assignments(self, wanted):
+        """{course_id: assignment (or None)} for {course_id: quiz or assignment id}, sections in parallel"""
+        with ThreadPoolExecutor(max_workers=max(1, min(self.jobs, len(wanted)))) as pool:
+            futures = {course_id: pool.submit(self.find_assignment, course_id, quiz_or_assignment_id)
+                       for (course_id, quiz_or_assignment_id) in wanted.items()}
+            return {course_id: future.result() for (course_id, future) in futures.items()}
+
+    def roster(self, course_id, assignment_id, submitted_since=None):
+        """Submissions (with user) for assignment_id in course_id
+
+        With submitted_since only submissions made since then are listed,
+        filtered by Canvas on the multiple submissions endpoint.
+        """
+        if submitted_since is None:
+            return list(self.canvas.paginate(f'courses/{course_id}/assignments/{assignment_id}/submissions',
+                                             params={'include': ['user']}))
+        return list(self.canvas.paginate(f'courses/{course_id}/students/submissions',
+                                         params={'include[]': 'user',
+                                                 'student_ids[]': 'all',
+                                                 'assignment_ids[]': str(assignment_id),
+                                                 'submitted_since': submitted_since}))
+
+    def submissions(self, course_id, assignment_id):
+        """Current submissions (with their comments) for assignment_id in course_id"""
+        return list(self.canvas.paginate(f'courses/{course_id}/students/submissions',
+                                         params={'student_ids[]': 'all',
+                                                 'assignment_ids[]': str(assignment_id),
+                                                 'include[]': 'submission_comments'}))
+
+
+def rest_assignment(node):
+    assignment = {'id': int(node['_id']), 'name': node['name']}
+    if node.get('quiz'):
+        assignment['quiz_id'] = int(node['quiz']['_id'])
+    return assignment
+
+
+def rest_submission(node):
+    user = node.get('user') or {}
+    submission = {'id': int(node['_id']),
+                  'user_id': int(node['userId']) if node.get('userId') else None,
+                  # REST has no attempt before the first submission
+                  'attempt': node.get('attempt') or None,
+                  'workflow_state': node.get('state'),
+                  'submitted_at': node.get('submittedAt'),
+                  'score': node.get('score'),
+                  'entered_score': node.get('enteredScore'),
+                  'grade_matches_current_submission': node.get('gradeMatchesCurrentSubmission')}
+    if 'user' in node:
+        submission['user'] = {'id': int(user['_id']) if user.get('_id') else None,
+                              'sortable_name': user.get('sortableName')}
+    if 'commentsConnection' in node:
+        submission['submission_comments'] = [
+            {'attempt': comment.get('attempt'),
+             'attachments': [{'id': int(attachment['_id']),
+                              'display_name': attachment.get('displayName'),
+                              'size': attachment.get('size')}
+                             for attachment in comment.get('attachments') or []]}
+            for comment in node['commentsConnection']['nodes']]
+    return submission
+
+
+class GraphQLBackend:
+    """Assignments and submissions from Canvas GraphQL, following connection cursors"""
+    name = 'graphql'
+
+    def __init__(self, canvas, jobs=8):
+        self.canvas = canvas
+        self.jobs = jobs
+        self.url = f'{canvas.base_url}/api/graphql'
+
+    def query(self, query, variables):
+        """data of one GraphQL query; errors raise RuntimeError"""
+        response = self.canvas.post(self.url,
+                                    json={'query': query, 'variables': variables})
+        response.raise_for_status()
+        result = response.json()
+        if result.get('errors'):
+            raise RuntimeError(f'GraphQL: {"; ".join(error.get("message", str(error)) for error in result["errors"])}')
+        return result['data']
+
+    def connection(self, query, variables, path, first_page=None):
+        """Yield the nodes of the connection at path in query's data, page by page
+
+        first_page, if given, is the connection already fetched for the
+        first page (see find_assignments).
+        """
+        variables = dict(variables, after=None)
+        page = first_page
+        while True:
+            if page is None:
+                page = self.query(query, variables)
+                for key in path:
+                    # a course or assignment Canvas doesn't know comes back null
+                    page = page.get(key)
+                    if page is None:
+                        raise RuntimeError(f'GraphQL: no {key} for {variables}')
+            yield from page['nodes']
+            if not page['pageInfo']['hasNextPage']:
+                return
+            variables['after'] = page['pageInfo']['endCursor']
+            page = None
+
+    def find_assignments(self, wanted):
+        """{course_id: assignment (or None)} for {course_id: quiz or assignment id}
+
+        The first page of every section's assignment list comes back in one
+        query; sections with more pages are then followed on their own.
+        """
+        course_ids = list(wanted)
+        if not course_ids:
+            return {}
+        batch = 'query BatchAssignments(%s) {\n%s}\n' % (
+            ', '.join(f'$c{n}: ID!' for n in range(len(course_ids))),
+            ''.join(f'  c{n}: course(id: $c{n}) {{ assignmentsConnection(first: {Page_Size}) {{ {Assignment_Fields} }} }}\n'
+                    for n in range(len(course_ids))))
+        data = self.query(batch, {f'c{n}': str(course_id) for (n, course_id) in enumerate(course_ids)})
+
+        def find(n):
+            course_id = course_ids[n]
+            if (data.get(f'c{n}') or {}).get('assignmentsConnection') is None:
+                raise RuntimeError(f'GraphQL: no course {course_id}')
+            nodes = self.connection(Assignments_Query, {'courseId': str(course_id)},
+                                    ('course', 'assignmentsConnection'),
+                                    first_page=data[f'c{n}']['assignmentsConnection'])
+            return match_assignment(map(rest_assignment, nodes), wanted[course_id])
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.jobs, len(course_ids)))) as pool:
+            return dict(zip(course_ids, pool.map(find, range(len(course_ids)))))
+
+    def fetch(self, assignment_id, with_user, with_comments):
+        nodes = self.connection(Submissions_Query,
+                                {'assignmentId': str(assignment_id), 'withUser': with_user,
+                                 'withComments': with_comments},
+                                ('assignment', 'submissionsConnection'))
+        return [rest_submission(node) for node in nodes]
+
+    def roster(self, course_id, assignment_id, submitted_since=None):
+        """Submissions (with user) for assignment_id in course_id
+
+        With submitted_since only submissions made since then are listed
+        (filtered here: one pass over the connection either way).
+        """
+        submissions = self.fetch(assignment_id, True, False)
+        if submitted_since is not None:
+            since = parse_time(submitted_since)
+            submissions = [submission for submission in submissions
+                           if submission['submitted_at'] is not None and parse_time(submission['submitted_at']) >= since]
+        return submissions
+
+    def submissions(self, course_id, assignment_id):
+        """Current submissions (with their comments) for assignment_id in course_id"""
+        return self.fetch(assignment_id, False, True)
+
+
+def make_backend(canvas, name='rest', jobs=8):
+    """The --api backend called name"""
+    assert name in Backends, f'Unknown api {name}'
+    return GraphQLBackend(canvas, jobs) if name == 'graphql' else RestBackend(canvas, jobs)
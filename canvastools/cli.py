@@ -0,0 +1,71 @@
+#! /usr/bin/env python3
+"""
+cli.py
+
+canvastools <subcommand> [options]
+
+    Single entry point for the CanvasTools scripts.
+
+    Subcommand modules are imported only once their name has been read
+    from the command line, and the modules themselves defer requests,
+    numpy and pandas until they actually need them, so that --help and
+    argument errors come back immediately.  Keep it that way: this module
+    must only import the standard library (see startup_budget.py).
+
+"""
+import sys
+import argparse
+import importlib
+
+from . import __version__
+
+# subcommand: (module, one line description)
+Subcommands = {
+    'add_calendar_events': ('canvastools.add_calendar_events', 'Add events to a Canvas calendar'),
+    'copy_rubric': ('canvastools.copy_rubric', 'Copy the rubric xlsx file for every student'),
+    'create_groups': ('canvastools.create_groups', 'Create Canvas groups from an attendance csv file'),
+    'create_roll': ('canvastools.create_roll', 'Create grading roll from Canvas grading file'),
+    'grade_session': ('canvastools.grade_session', 'Open each ungraded student\'s submission and xlsx file in turn'),
+    'grades_to_xlsx': ('canvastools.grades_to_xlsx', 'Write per-student score xlsx files from SortGrades.csv'),
+    'status': ('canvastools.hash_index', 'List remaining, graded, uploaded and modified students'),
+    'submit_assignment': ('canvastools.submit_assignment', 'Submit a graded Canvas assignment'),
+    'submit_grades': ('canvastools.submit_grades', 'Submit graded quiz scores and comments'),
+    'xlsx_benchmark': ('canvastools.xlsx_reader', 'Benchmark xlsx_reader against pandas.read_excel'),
+}
+
+
+def make_parser():
+    width = max(len(name) for name in Subcommands)
+    subcommand_help = '\n'.join(f'  {name:{width}}  {description}'
+                                for (name, (_, description)) in Subcommands.items())
+    parser = argparse.ArgumentParser(prog='canvastools',
+                                     description='CanvasTools: grade Canvas assignments',
+                                     epilog=f'subcommands:\n{subcommand_help}\n\n'
+                                            f'Run "canvastools <subcommand> --help" for its options.',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--version',
+                        action='version',
+                        version=f'%(prog)s {__version__}')
+    parser.add_argument('subcommand',
+                        metavar='subcommand',
+                        choices=sorted(Subcommands),
+                        help='one of the subcommands listed below')
+    parser.add_argument('args',
+                        nargs=argparse.REMAINDER,
+                        help='options for the subcommand')
+    return parser
+
+
+def main(argv=None):
+    args = make_parser().parse_args(sys.argv[1:] if argv is None else argv)
+
+    ##
+    # Hand the rest of the command line to the subcommand's own parser
+    (module_name, _) = Subcommands[args.subcommand]
+    module = importlib.import_module(module_name)
+    sys.argv = [f'canvastools {args.subcommand}'] + args.args
+    return module.main()
+
+
+if __name__ == '__main__':
+    main()
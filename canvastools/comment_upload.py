@@ -0,0 +1,355 @@
+#! /usr/bin/env python3
+"""
+comment_upload.py
+
+Attaching a file to a submission comment (submit_assignment's xlsx files).
+
+    Canvas file uploads take four requests:
+
+        1. ask for an upload url     POST {submission}/comments/files
+        2. send the file             POST upload_url (no Canvas token)
+        3. confirm the upload        POST or GET the location from step 2
+        4. attach it as a comment    PUT {submission} comment[file_ids][]
+
+    Step 1 only needs the file's name and size, so CommentUploader.prepare()
+    sends it on its own thread pool for the next queued file while the
+    current one goes through steps 2-4.
+
+    Grades matter more than comment files, so submit_assignment posts
+    grades itself and only queues the comment files (CommentQueue).  The
+    queue is drained by worker threads started once every grade is
+    posted, and kept in Queue_File until each upload is done, so a run
+    that is interrupted leaves the rest for the next run to upload first.
+    Each queued record has an id and is only cleared by the done record
+    with that id; a file whose current content the journal already
+    records as uploaded is not queued again.
+
+    The file body is streamed from disk (MultipartFile) with a
+    Content-Length, never read into memory, and the file is closed however
+    the request ends.
+
+"""
+import sys
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .journal import file_sha256
+
+Xlsx_Content_Type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+Chunk_Size = 64 * 1024
+# comment uploads not yet done, in the assignment directory
+Queue_File = 'comment_queue.jsonl'
+
+
+class MultipartFile:
+    """multipart/form-data body of some fields and one file, read from disk as it is sent
+
+    Use it in a with statement: the file is closed on exit even if the
+    request never read it to the end.
+    """
+
+    def __init__(self, fields, filename, content_type, field_name='file'):
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        head = b''.join(f'--{boundary}\r\n'
+                        f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                        f'{value}\r\n'.encode()
+                        for (name, value) in fields.items())
+        quoted_name = os.path.basename(filename).replace('"', '%22')
+        head += (f'--{boundary}\r\n'
+                 f'Content-Disposition: form-data; name="{field_name}"; filename="{quoted_name}"\r\n'
+                 f'Content-Type: {content_type}\r\n\r\n').encode()
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+        self.file = open(filename, 'rb')
+        self.size = len(head) + os.fstat(self.file.fileno()).st_size + len(tail)
+        self.segments = [head, self.file, tail]
+
+    def __len__(self):
+        return self.size
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size
+        chunks = []
+        while size > 0 and self.segments:
+            segment = self.segments[0]
+            if isinstance(segment, bytes):
+                (chunk, rest) = (segment[:size], segment[size:])
+                if rest:
+                    self.segments[0] = rest
+                else:
+                    self.segments.pop(0)
+            else:
+                chunk = segment.read(min(size, Chunk_Size))
+                if not chunk:
+                    self.segments.pop(0)
+                    continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CommentUploader:
+    """Four-step comment file uploads, step 1 sent ahead on a thread pool"""
+
+    def __init__(self, canvas, jobs=4):
+        self.canvas = canvas
+        self.pool = ThreadPoolExecutor(max_workers=max(1, jobs))
+
+    def request_upload(self, comment_upload_uri, filename):
+        """1. Ask Canvas for an upload url for filename"""
+        upload_rq_params = {'name': os.path.basename(filename),
+                            'size': str(os.stat(filename).st_size),
+                            'content_type': Xlsx_Content_Type,
+                            'on_duplicate': 'overwrite'}
+        upload_rq_response = self.canvas.post(f'{comment_upload_uri}/comments/files/',
+                                              params=upload_rq_params)
+        upload_rq_response.raise_for_status()
+        return json.loads(upload_rq_response.text)
+
+    def prepare(self, comment_upload_uri, filename):
+        """Start step 1 now; hand the returned future to upload()"""
+        return self.pool.submit(self.request_upload, comment_upload_uri, filename)
+
+    def upload(self, comment_upload_uri, filename, upload_rq=None, report=None):
+        """Upload filename and attach it to the submission's comments; returns the Canvas file id
+
+        upload_rq is a future from prepare() (step 1 is sent now if None);
+        debugging output goes to report if given.
+        """
+        upload_rq = upload_rq.result() if upload_rq is not None else \
+            self.request_upload(comment_upload_uri, filename)
+        if report is not None:
+            report.out(f'* Request upload url response: {upload_rq}')
+
+        ##
+        # 2. Upload file to specified url
+        with MultipartFile(upload_rq.get('upload_params', {}), filename, Xlsx_Content_Type) as body:
+            do_upload_response = self.canvas.upload(upload_rq['upload_url'],
+                                                    data=body,
+                                                    headers={'Content-Type': body.content_type},
+                                                    allow_redirects=False)
+        if report is not None:
+            report.err(f'do_upload response: {do_upload_response.status_code} {do_upload_response.text}')
+
+        ##
+        # 3. Confirm upload (2 options: one for 201 response, another for 3XX response)
+        if do_upload_response.status_code == 201:
+            confirmation_response = self.canvas.post(json.loads(do_upload_response.text)['location'],
+                                                     params={'Content-Length': '0'})
+        else:
+            assert int(do_upload_response.status_code / 100) == 3, \
+                f'Erroneous status code from upload: {do_upload_response.status_code}'
+            confirmation_response = self.canvas.get(do_upload_response.headers['Location'])
+        confirmation_response.raise_for_status()
+        if report is not None:
+            report.err(f'confirmation response is {confirmation_response.text}')
+
+        ##
+        # 4. Set the comment
+        confirmation = json.loads(confirmation_response.text)
+        # not retried: a retry after Canvas added the comment would add it twice
+        comment_addfile = self.canvas.put(comment_upload_uri,
+                                          params={'comment[file_ids][]': f'{str(confirmation["id"])}'},
+                                          idempotent=False)
+        if report is not None:
+            report.err(f'comment_addfile " {comment_addfile.text}')
+        comment_addfile.raise_for_status()
+        return confirmation['id']
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class QueuedComment:
+    """One comment file waiting in a CommentQueue"""
+
+    def __init__(self, filename, comment_upload_uri, record_id=None):
+        self.filename = filename
+        self.comment_upload_uri = comment_upload_uri
+        # matches this upload's done record to its queued record
+        self.record_id = record_id or uuid.uuid4().hex
+        # step 1 future, sent while the previous file uploads
+        self.upload_rq = None
+        self.started = False
+
+
+class CommentQueue:
+    """Comment file uploads drained by worker threads, persisted until done"""
+
+    def __init__(self, uploader, journal, path=Queue_File):
+        self.uploader = uploader
+        self.journal = journal
+        self.path = path
+        self.items = deque()
+        # queued or uploading, and failed this run; both stay in path
+        self.pending = {}
+        self.failed = {}
+        self.condition = threading.Condition()
+        self.closing = False
+        self.threads = []
+        self.uploaded = 0
+        self.finished_at = None
+        self.file_lock = threading.Lock()
+
+        ##
+        # uploads an earlier run queued but never finished go first
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a torn last line from an interrupted run
+                        continue
+                    queued = self.pending.get(record['filename'])
+                    if record.get('done'):
+                        # (records from before ids were kept have none)
+                        if queued is not None and record.get('id') in (None, queued.record_id):
+                            del self.pending[record['filename']]
+                    else:
+                        self.pending[record['filename']] = QueuedComment(record['filename'],
+                                                                         record['comment_upload_uri'],
+                                                                         record.get('id'))
+            ##
+            # Drop files that are gone, and uploads that finished but died
+            # before their done record was written
+            self.pending = {filename: item for (filename, item) in self.pending.items()
+                            if os.path.exists(filename) and
+                            not journal.comment_uploaded(filename, file_sha256(filename))}
+            self.items.extend(self.pending.values())
+            self.rewrite()
+
+    def __len__(self):
+        """Uploads not done yet (including failed ones)"""
+        with self.condition:
+            return len(self.pending) + len(self.failed)
+
+    def append_record(self, **record):
+        with self.file_lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def rewrite(self):
+        # keep only the pending uploads (or no file at all)
+        with self.file_lock:
+            items = list(self.pending.values()) + list(self.failed.values())
+            if not items:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w') as f:
+                for item in items:
+                    f.write(json.dumps({'filename': item.filename,
+                                        'comment_upload_uri': item.comment_upload_uri,
+                                        'id': item.record_id}) + '\n')
+            os.replace(temp_path, self.path)
+
+    def put(self, filename, comment_upload_uri):
+        """Queue filename for upload as a comment on comment_upload_uri
+
+        A file already waiting its turn is not queued twice; one that is
+        uploading now is queued again, since it may have been saved since.
+        """
+        with self.condition:
+            waiting = self.pending.get(filename)
+            if waiting is not None and not waiting.started:
+                return
+            self.failed.pop(filename, None)
+            item = QueuedComment(filename, comment_upload_uri)
+            self.pending[filename] = item
+            self.append_record(filename=filename, comment_upload_uri=comment_upload_uri, id=item.record_id)
+            self.items.append(item)
+            self.condition.notify()
+
+    def discard(self, filename):
+        """Drop filename's upload if it is still waiting its turn"""
+        with self.condition:
+            item = self.failed.pop(filename, None)
+            waiting = self.pending.get(filename)
+            if waiting is not None and not waiting.started:
+                del self.pending[filename]
+                self.items.remove(waiting)
+                item = waiting
+            if item is not None:
+                self.append_record(filename=filename, id=item.record_id, done=True)
+
+    def start(self, workers=1):
+        """Add workers draining the queue"""
+        for _ in range(workers):
+            thread = threading.Thread(target=self.worker, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def worker(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.items or self.closing)
+                if not self.items:
+                    return
+                item = self.items.popleft()
+                item.started = True
+                # step 1 for the next file while this one uploads
+                if self.items and self.items[0].upload_rq is None:
+                    upcoming = self.items[0]
+                    upcoming.upload_rq = self.uploader.prepare(upcoming.comment_upload_uri, upcoming.filename)
+            self.upload(item)
+
+    def upload(self, item):
+        try:
+            # the file as it is now, even if it changed after it was queued
+            sha256 = file_sha256(item.filename)
+            file_id = self.uploader.upload(item.comment_upload_uri, item.filename, item.upload_rq)
+            self.journal.record(item.filename, sha256=sha256, file_id=file_id)
+            self.append_record(filename=item.filename, id=item.record_id, done=True)
+            with self.condition:
+                if self.pending.get(item.filename) is item:
+                    del self.pending[item.filename]
+                self.uploaded += 1
+                self.finished_at = time.monotonic()
+            print(f'  Uploaded comment file for {item.filename}',
+                  flush=True)
+        except Exception as err:
+            with self.condition:
+                if self.pending.get(item.filename) is item:
+                    del self.pending[item.filename]
+                    self.failed[item.filename] = item
+            print(f'* Excel comment file upload failed for [{item.filename}]\n   {err}',
+                  file=sys.stderr,
+                  flush=True)
+
+    def close(self):
+        """Wait until the queue is drained (or interrupted), then compact Queue_File"""
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        try:
+            for thread in self.threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        finally:
+            with self.condition:
+                self.rewrite()
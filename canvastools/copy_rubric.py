@@ -0,0 +1,288 @@
+#! /usr/bin/env python3
+# noinspection SpellCheckingInspection
+"""
+copy_rubric.py
+
+Assumptions:
+  0. You use the Canvas LMS for a class or several classes you are teaching or assisting with.
+  1. The current directory where you are running this is a grades directory.
+  2. You have a config file (default value: ./config*)
+  3. You have a grading rubric .xlsx file (preferably in some other directory).
+  4. You have a Canvas API Token in a file
+
+"""
+
+import sys
+import argparse
+import json
+import os
+import fnmatch
+#import tempfile
+#import numpy
+#import typing
+import time
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# I really don't do that requirements.txt thing
+# You'll probably have to pip3 install these:import requests
+import csv
+
+from .canvas_client import CanvasClient, read_token, resolve_base_url
+from .response_cache import ResponseCache
+from .file_copy import Copy_Methods, FileCopier
+from .canvas_data import Backends, make_backend, parse_time
+
+
+Software_Version = 0.5
+SIS_ID_Index = 2
+
+# start time of each course's last incremental run (--submitted_since last)
+Sync_File = 'copy_rubric_sync.json'
+
+Debug = False
+Dry_run = False
+
+
+def student_filename(entry_dict, course_id):
+    """Rubric copy filename for one submissions list entry"""
+    name = entry_dict['user']['sortable_name']
+    name = name.replace(' ','')
+    name = name.replace(',','-')
+    test_student_name = 'Student-Test'
+    if name[:len(test_student_name)] == test_student_name:
+        name = f'Zz-{name}'
+    return f'{name}-{entry_dict["user"]["id"]}-{course_id}.xlsx'
+
+
+def fetch_roster(backend, course_id, assignment_id, submitted_since=None):
+    """Submissions list entries (with user) for assignment_id in course_id
+
+    With submitted_since only submissions made since then are listed
+    (see canvas_data.py for the rest and graphql backends).
+    """
+    entries = backend.roster(course_id, assignment_id, submitted_since)
+    if Debug:
+        for entry_dict in entries:
+            print(f'entry: {entry_dict}')
+    return entries
+
+
+def has_submitted(entry_dict, submitted_since=None):
+    """True if the student turned something in (since submitted_since, if given)"""
+    submitted_at = entry_dict.get('submitted_at')
+    if submitted_at is None or entry_dict.get('workflow_state') == 'unsubmitted':
+        return False
+    return submitted_since is None or parse_time(submitted_at) >= parse_time(submitted_since)
+
+
+def read_sync_times(path=Sync_File):
+    """When each course was last synced with -incremental, by course id"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_sync_times(sync_times, path=Sync_File):
+    with open(path, 'w') as f:
+        json.dump(sync_times, f, indent=1)
+
+
+def main():
+    global Debug
+    global Dry_run
+
+    access_token = None
+    asst_entry = None
+    config = None
+
+    parser = argparse.ArgumentParser(description='Copy rubric files')
+    parser.add_argument('--config',
+                        help='file containing config info (default: ./config*)',
+                        default=None)
+    parser.add_argument('--rubric',
+                        help="rubric xlsx file for assignment (default: ./rubric*.xlsx)",
+                        default=None)
+    parser.add_argument('--token',
+                        help='Canvas Access Token File (default: ../API_token)',
+                        default='../API_token')
+    parser.add_argument('--canvas_url',
+                        help='Canvas base URL (default: config "canvas_url" or https://ufl.instructure.com)',
+                        default=None)
+    parser.add_argument('--copy_method',
+                        help='How to copy the rubric: reflink, copy_file_range, copy or hardlink '
+                             '(default: auto, the fastest of the first three that works)',
+                        choices=Copy_Methods,
+                        default='auto')
+    parser.add_argument('--jobs',
+                        help='Number of sections fetched and files created concurrently (default: 8)',
+                        type=int,
+                        default=8)
+    parser.add_argument('-incremental',
+                        help='Only create files for students who have submitted and have no file yet',
+                        action='store_true')
+    parser.add_argument('--submitted_since',
+                        help='With -incremental: only students who submitted since this ISO 8601 time, '
+                             f'or "last" for since the previous incremental run (kept in {Sync_File})',
+                        default=None)
+    parser.add_argument('--api',
+                        help='How to read the submissions lists: rest or graphql (default: rest)',
+                        choices=Backends,
+                        default='rest')
+    parser.add_argument('--no-cache', '-no_cache',
+                        dest='no_cache',
+                        help='Ignore the on-disk Canvas metadata cache',
+                        action='store_true')
+    parser.add_argument('-debug',
+                        help='Set verbose debugging mode',
+                        action='store_true')
+    parser.add_argument('-n',
+                        help='Dry run: list the rubric files but do not create them',
+                        action='store_true')
+
+    args = parser.parse_args()
+    Debug = args.debug
+
+    Dry_run = args.n
+
+    # parse config file
+    if not args.config:
+        config_file = fnmatch.filter(os.listdir('.'), 'config*')
+        assert not (len(config_file) < 1), 'No config file!'
+        assert not (len(config_file) > 1), f'Too many config files:{config_file}'
+        config_file = config_file[0]
+    else:
+        config_file = args.config
+
+    try:
+        with open(config_file) as f:
+            config = json.load(f)
+            f.close()
+    except Exception as err:
+        print(f'Unable to open or parse config file: [{config_file}]: {err}',
+              file=sys.stderr,
+              flush=True)
+        exit(1)
+
+    # Get rubric filename
+    if not args.rubric:
+        rubric_file = fnmatch.filter(os.listdir('.'), 'rubric*.xlsx')
+        assert not (len(rubric_file) < 1), 'No rubric file!'
+        assert not (len(rubric_file) > 1), f'Too many rubric files:{rubric_file}'
+        rubric_file = rubric_file[0]
+    else:
+        rubric_file = args.rubric
+
+    ##
+    # read Canvas token from file
+    try:
+        access_token = read_token(args.token)
+    except Exception as err:
+        print(f"Couldn't read API token file {args.token}\n   {err}",
+              file=sys.stderr,
+              flush=True)
+        exit(2)
+
+    canvas = CanvasClient(access_token, base_url=resolve_base_url(args.canvas_url, config),
+                          cache=None if args.no_cache else ResponseCache())
+
+    backend = make_backend(canvas, args.api, args.jobs)
+
+    assignment_map = config['quiz_ids']
+    if args.submitted_since and not args.incremental:
+        print('--submitted_since needs -incremental',
+              file=sys.stderr,
+              flush=True)
+        exit(1)
+    sync_times = read_sync_times()
+    sync_started = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def course_since(course_id):
+        if args.submitted_since == 'last':
+            return sync_times.get(course_id)
+        return args.submitted_since
+
+    ##
+    # Download the submissions list of every section at once
+    def section_roster(course_id):
+        try:
+            return fetch_roster(backend, course_id, assignment_map[course_id], course_since(course_id))
+        except Exception as err:
+            print(f'copy_rubric failed for course {course_id}:\n   {err}',
+                  file=sys.stderr,
+                  flush=True)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        rosters = dict(zip(assignment_map.keys(), pool.map(section_roster, assignment_map.keys())))
+
+    new_filenames = []
+    not_submitted = 0
+    existing = 0
+    for (course_id, roster) in rosters.items():
+        for entry_dict in roster or []:
+            new_filename = student_filename(entry_dict, course_id)
+            if args.incremental:
+                ##
+                # Leave graded work alone: only students who turned something
+                # in, and only if they have no rubric copy yet
+                if not has_submitted(entry_dict, course_since(course_id)):
+                    not_submitted += 1
+                    continue
+                if os.path.exists(new_filename):
+                    existing += 1
+                    continue
+            new_filenames.append(new_filename)
+    if args.incremental:
+        print(f'{len(new_filenames)} new students, {existing} already have a file, '
+              f'{not_submitted} not submitted{" since the last sync" if args.submitted_since else ""}',
+              flush=True)
+
+    if Dry_run:
+        for new_filename in new_filenames:
+            print(f'Would create {new_filename}',
+                  flush=True)
+        print(f'{len(new_filenames)} rubric files; no files actually created',
+              flush=True)
+        return
+
+    ##
+    # Create the rubric copies, several at a time: on a network home
+    # directory each file creation is a round trip to the server
+    copier = FileCopier(rubric_file, args.copy_method)
+
+    def create(new_filename):
+        try:
+            copier.copy(new_filename)
+            return None
+        except Exception as err:
+            return f'Unable to create xlsx file for [{new_filename}]: {str(err)}'
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        errors = [error for error in pool.map(create, new_filenames) if error is not None]
+    elapsed = time.perf_counter() - start
+
+    created = len(new_filenames) - len(errors)
+    print(f'{created} rubric files created in {elapsed:.2f}s'
+          f' ({created / elapsed if elapsed > 0 else 0:.0f} files/s, {copier.method})',
+          flush=True)
+    if errors:
+        for error in errors:
+            print(error,
+                  file=sys.stderr,
+                  flush=True)
+        exit(1)
+
+    ##
+    # Next --submitted_since last starts where this run started
+    if args.incremental:
+        sync_times.update({course_id: sync_started
+                           for (course_id, roster) in rosters.items() if roster is not None})
+        write_sync_times(sync_times)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,13 +16,13 @@ import os
 import fnmatch
 import re
 import tempfile
-import numpy
 
 # I really don't do that requirements.txt thing
 # You'll probably have to pip3 install these:
-import requests
 import csv
 
+from .canvas_client import CanvasClient, read_token, resolve_base_url
+
 Software_Version = 0.5
 SIS_ID_Index = 2
 
@@ -44,6 +44,9 @@ def main():
     parser.add_argument('--token',
                         help='Canvas Access Token File',
                         default='../API_token')
+    parser.add_argument('--canvas_url',
+                        help='Canvas base URL (default: https://ufl.instructure.com)',
+                        default=None)
     parser.add_argument('-debug',
                         help='Set verbose debugging mode',
                         action='store_true')
@@ -52,7 +55,8 @@ def main():
                         action='store_true')
 
     args = parser.parse_args()
-    uri_base = f'https://ufl.instructure.com/api/v1/'
+    # numpy is only needed once the arguments are good
+    import numpy
     dry_run = args.n
     indent_string = '\n   '
     ##
@@ -60,18 +64,16 @@ def main():
     ##
     # read Canvas token from file
     try:
-        with open(args.token) as f:
-            access_token = f.readline()
-            f.close()
+        access_token = read_token(args.token)
     except Exception as err:
         print(f"Couldn't read access token file {args.token}\n   {err}",
               file=sys.stderr,
               flush=True)
         exit(2)
 
-    headers = {'Authorization': f'Bearer {access_token.rstrip()}'}
-    csv_headers = {'Content-Type': 'text/csv',
-                   'Authorization': f'Bearer {access_token.rstrip()}'}
+    canvas = CanvasClient(access_token, base_url=resolve_base_url(args.canvas_url))
+    uri_base = canvas.api_base
+    csv_headers = {'Content-Type': 'text/csv'}
     ##
     # Read In-class vs online assignments from canvas grades file
     #
@@ -119,9 +121,8 @@ def main():
             if args.debug:
                 print(f"uri = {group_categories_uri}")
             if not dry_run:
-                group_categories_response = requests.post(url=group_categories_uri,
-                                                          headers=headers,
-                                                          params=group_categories_rq_params)
+                group_categories_response = canvas.post(group_categories_uri,
+                                                        params=group_categories_rq_params)
                 group_category_object = json.loads(group_categories_response.text)
                 if args.debug:
                     print(f'group_categories_response: {group_categories_response.text}')
@@ -183,9 +184,9 @@ def main():
             if dry_run:
                 # print(f'requested groups:\n{raw_data}')
                 continue
-            import_response = requests.post(url=import_uri,
-                                            data=raw_data,
-                                            headers=csv_headers)
+            import_response = canvas.post(import_uri,
+                                          data=raw_data,
+                                          headers=csv_headers)
             if args.debug:
                 print(f'import_response: {import_response.text}')
         except Exception as err:
@@ -0,0 +1,140 @@
+#! /usr/bin/env python3
+"""
+file_copy.py
+
+Making many copies of one file (copy_rubric's rubric fan-out).
+
+    Methods, fastest first:
+
+        reflink           copy-on-write clone sharing the source's blocks
+                          (Linux FICLONE on btrfs/xfs, macOS clonefile on APFS)
+        copy_file_range   in-kernel copy; server-side on NFS 4.2 and SMB
+        copy              write the source bytes, read once, into each file
+        hardlink          another name for the source file; whatever opens
+                          the file for grading must break the link first
+                          (break_link, grade_session does this)
+
+    'auto' tries reflink, then copy_file_range, then copy, and sticks to
+    the first one that works.  Every method except hardlink gives the copy
+    the source's timestamps, as shutil.copy2 did.
+
+"""
+import os
+import sys
+import shutil
+import threading
+
+Copy_Methods = ('auto', 'reflink', 'copy_file_range', 'copy', 'hardlink')
+Auto_Methods = ('reflink', 'copy_file_range', 'copy')
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+def temp_name(filename):
+    """Scratch name next to filename (for write then rename)"""
+    return f'{filename}.{os.getpid()}.tmp'
+
+
+def reflink(source, filename):
+    """Clone source to the new file filename; OSError if the file system can't"""
+    if sys.platform == 'darwin':
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(source), os.fsencode(filename), 0) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), source)
+        return
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(f'reflink not supported on {sys.platform}')
+    with open(source, 'rb') as src, open(filename, 'xb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def copy_range(source, filename):
+    """Copy source to the new file filename in the kernel; OSError if not supported"""
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError(f'copy_file_range not supported on {sys.platform}')
+    with open(source, 'rb') as src, open(filename, 'xb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def break_link(filename):
+    """Give filename its own copy of its data if it is hard linked elsewhere"""
+    if os.stat(filename).st_nlink < 2:
+        return False
+    temp_path = temp_name(filename)
+    shutil.copy2(filename, temp_path)
+    os.replace(temp_path, filename)
+    return True
+
+
+class FileCopier:
+    """Copies one source file to many destinations with a chosen method"""
+
+    def __init__(self, source, method='auto'):
+        assert method in Copy_Methods, f'Unknown copy method {method}'
+        self.source = source
+        self.method = method
+        self.data = None
+        self.lock = threading.Lock()
+
+    def write(self, filename):
+        # plain copy from the source bytes, read once
+        with self.lock:
+            if self.data is None:
+                with open(self.source, 'rb') as f:
+                    self.data = f.read()
+        with open(filename, 'xb') as f:
+            f.write(self.data)
+
+    def copy(self, filename):
+        """Create (or replace) filename as a copy of the source; returns the method used
+
+        The copy is made under a scratch name and renamed over filename,
+        so a method that fails leaves filename as it was.
+        """
+        method = self.method
+        if method == 'auto':
+            for method in Auto_Methods:
+                try:
+                    self.replace(method, filename)
+                    break
+                except OSError:
+                    if method == Auto_Methods[-1]:
+                        raise
+            # later copies go straight to the method that worked
+            self.method = method
+        else:
+            self.replace(method, filename)
+        return method
+
+    def replace(self, method, filename):
+        temp_path = temp_name(filename)
+        try:
+            if method == 'reflink':
+                reflink(self.source, temp_path)
+            elif method == 'copy_file_range':
+                copy_range(self.source, temp_path)
+            elif method == 'hardlink':
+                os.link(self.source, temp_path)
+            else:
+                self.write(temp_path)
+            if method != 'hardlink':
+                shutil.copystat(self.source, temp_path)
+            os.replace(temp_path, filename)
+            if os.path.lexists(temp_path):
+                # filename already was this link: rename() leaves both names
+                os.remove(temp_path)
+        except BaseException:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -0,0 +1,125 @@
+#! /usr/bin/env python3
+"""
+file_watch.py
+
+Noticing files being saved in a directory (submit_assignment --watch).
+
+    On Linux the directory is watched with inotify (through libc, no extra
+    package): a file closed after writing, or renamed into place the way
+    Excel and LibreOffice save, is reported right away.  Elsewhere, or if
+    inotify is unavailable, the directory is scanned every interval seconds
+    for files whose size or modification time changed.
+
+    A spreadsheet save is several writes and renames in quick succession,
+    so settled_changes() only hands a file on once it has been quiet for
+    debounce seconds.
+
+"""
+import os
+import sys
+import select
+import struct
+import time
+
+# sys/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CLOEXEC = 0o2000000
+Event_Header = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Names of files written or renamed into directory, from inotify"""
+    name = 'inotify'
+
+    def __init__(self, directory):
+        import ctypes
+
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), directory)
+
+    def wait(self, timeout):
+        """Names changed within timeout seconds (maybe none)"""
+        (readable, _, _) = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset < len(data):
+            (_, _, _, length) = Event_Header.unpack_from(data, offset)
+            offset += Event_Header.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Names of files whose size or mtime changed, by rescanning directory"""
+    name = 'polling'
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self.stats = self.scan()
+
+    def scan(self):
+        stats = {}
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                # deleted while scanning
+                continue
+        return stats
+
+    def wait(self, timeout):
+        """Names changed since the last call (waits up to timeout seconds)"""
+        time.sleep(min(timeout, self.interval))
+        stats = self.scan()
+        names = [name for (name, stat) in stats.items() if self.stats.get(name) != stat]
+        self.stats = stats
+        return names
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory='.', interval=1.0):
+    """inotify watcher where there is one, else a polling one"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory, interval)
+
+
+def settled_changes(watcher, accept, debounce=2.0, directory='.'):
+    """Yield lists of accepted names, each name once it has been quiet for debounce seconds"""
+    pending = {}
+    while True:
+        now = time.monotonic()
+        timeout = min((changed + debounce - now for changed in pending.values()), default=debounce)
+        for name in watcher.wait(max(0.05, timeout)):
+            if accept(name):
+                pending[name] = time.monotonic()
+        now = time.monotonic()
+        ready = sorted(name for (name, changed) in pending.items() if now - changed >= debounce)
+        for name in ready:
+            del pending[name]
+        ready = [name for name in ready if os.path.exists(os.path.join(directory, name))]
+        if ready:
+            yield ready
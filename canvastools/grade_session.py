@@ -0,0 +1,266 @@
+#! /usr/bin/env python3
+"""
+grade_session.py
+
+Assumptions:
+
+    The current directory is an assignment directory holding
+        - the rubric (default: ./rubric*.xlsx)
+        - one copy of it per student, named   NNNN-SSSS-CCCC.xlsx
+          (see copy_rubric.py), SSSS being the Canvas student id
+        - the unzipped "Download Submissions" files, whose names contain
+          the student id (e.g. doejane_1234_5678_ex1.pdf)
+
+    For each student whose xlsx file is still identical to the rubric (by
+    its hash, see hash_index.py), the submission is opened in the pdf
+    viewer and the xlsx file in the spreadsheet program; when the
+    spreadsheet program exits (on a Mac: *QUIT* Excel with Cmd-Q) the next
+    student comes up.
+
+    While one student is being graded, the next ungraded student is found
+    and their files are read ahead in the background, so the next student
+    opens right away.  The time spent on each student is appended to
+    Times_File.
+
+"""
+import sys
+import argparse
+import csv
+import datetime
+import fnmatch
+import os
+import platform
+import re
+import shlex
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .file_copy import break_link
+from .hash_index import HashIndex, find_rubric
+
+Times_File = 'grading_times.csv'
+
+# An editor command that returns sooner than this may have handed the file
+# to a running LibreOffice (see wait_until_closed)
+Quick_Return_Seconds = 5
+Lock_Appear_Seconds = 10
+
+
+def default_commands():
+    """(pdf viewer, spreadsheet program) commands for this platform
+
+    The spreadsheet command must not return until its window is closed.
+    libreoffice --calc returns at once when LibreOffice is already running;
+    wait_until_closed() covers that.
+    """
+    if 'WSL_DISTRO_NAME' in os.environ:
+        return ['cmd.exe', '/c', 'start', '""'], ['cmd.exe', '/c', 'start', '""', '/wait']
+    if platform.system() == 'Darwin':
+        return ['open'], ['open', '-W', '-n']
+    if platform.system() == 'Windows':
+        return ['cmd', '/c', 'start', '""'], ['cmd', '/c', 'start', '""', '/wait']
+    return ['atril'], ['libreoffice', '--calc']
+
+
+def libreoffice_lock(filename):
+    """The lock file LibreOffice keeps next to filename while it is open"""
+    (directory, name) = os.path.split(filename)
+    return os.path.join(directory, f'.~lock.{name}#')
+
+
+def wait_until_closed(filename, elapsed, appear=Lock_Appear_Seconds, poll=0.5):
+    """Wait for LibreOffice to close filename if the editor command returned at once
+
+    A libreoffice command that finds LibreOffice running hands it the file
+    and exits; the file is open for as long as its lock file exists.
+    """
+    if elapsed >= Quick_Return_Seconds:
+        return
+    lock = libreoffice_lock(filename)
+    deadline = time.monotonic() + appear
+    while not os.path.exists(lock) and time.monotonic() < deadline:
+        time.sleep(poll)
+    if os.path.exists(lock):
+        print(f'  waiting for {filename} to be closed (or delete {lock} if LibreOffice crashed)',
+              flush=True)
+    while os.path.exists(lock):
+        time.sleep(poll)
+
+
+def student_id(xlsx_filename):
+    """Canvas student id from NNNN-SSSS-CCCC.xlsx"""
+    base = xlsx_filename[:xlsx_filename.rfind('-')]
+    return base[base.rfind('-') + 1:]
+
+
+def submission_index(filenames):
+    """Submission filenames keyed by every number in their names"""
+    index = {}
+    for filename in filenames:
+        for number in set(re.findall(r'\d+', filename)):
+            index.setdefault(number, []).append(filename)
+    return index
+
+
+class Student:
+    def __init__(self, xlsx_filename, submissions):
+        self.xlsx_filename = xlsx_filename
+        self.sid = student_id(xlsx_filename)
+        self.submissions = submissions
+
+
+def build_session(rubric_file, submission_pattern):
+    """Every student's xlsx file and submission files, from one directory listing"""
+    filenames = sorted(os.listdir('.'))
+    submissions = submission_index(fnmatch.filter(filenames, submission_pattern))
+    return [Student(xlsx_filename, sorted(submissions.get(student_id(xlsx_filename), [])))
+            for xlsx_filename in fnmatch.filter(filenames, '*-*.xlsx')
+            if xlsx_filename != os.path.basename(rubric_file)]
+
+
+def is_ungraded(student, index, rubric_sha256):
+    """True while the student's xlsx file is still identical to the rubric"""
+    return index.sha256(student.xlsx_filename) == rubric_sha256
+
+
+def read_ahead(filename):
+    # pull the file into the OS cache (slow on network home directories)
+    with open(filename, 'rb') as f:
+        while f.read(1 << 20):
+            pass
+
+
+def next_student(students, start, index, rubric_sha256, regrade):
+    """Position of the first student from start on still to grade (prepared to open), or None"""
+    for position in range(start, len(students)):
+        student = students[position]
+        if not regrade and not is_ungraded(student, index, rubric_sha256):
+            continue
+        # a hardlinked copy (copy_rubric --copy_method hardlink) gets its own data now
+        break_link(student.xlsx_filename)
+        for filename in [student.xlsx_filename] + student.submissions:
+            read_ahead(filename)
+        return position
+    return None
+
+
+def record_time(student, started, seconds, path=Times_File):
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(['filename', 'started', 'seconds'])
+        writer.writerow([student.xlsx_filename, started, f'{seconds:.1f}'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Open each ungraded student\'s submission and xlsx file in turn')
+    parser.add_argument('--rubric',
+                        help='rubric xlsx file for assignment (default: ./rubric*.xlsx)',
+                        default=None)
+    parser.add_argument('--submissions',
+                        help='pattern of the submission files (default: *.pdf)',
+                        default='*.pdf')
+    parser.add_argument('--pdf_viewer',
+                        help='command that opens a submission (default: atril, open or start)',
+                        default=None)
+    parser.add_argument('--xlsx_editor',
+                        help='command that opens an xlsx file and waits until it is closed '
+                             '(default: libreoffice --calc, open -W -n or start /wait)',
+                        default=None)
+    parser.add_argument('-regrade',
+                        help='Open every student, not just those whose file still matches the rubric',
+                        action='store_true')
+    parser.add_argument('-no_pause',
+                        help='Open the next student as soon as the spreadsheet is closed, without asking',
+                        action='store_true')
+    parser.add_argument('-debug',
+                        help='Set verbose debugging mode',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    # Get rubric filename
+    rubric_file = args.rubric or find_rubric()
+    assert rubric_file is not None, 'No rubric file (or too many rubric*.xlsx files)!'
+
+    (pdf_viewer, xlsx_editor) = default_commands()
+    if args.pdf_viewer:
+        pdf_viewer = shlex.split(args.pdf_viewer)
+    if args.xlsx_editor:
+        xlsx_editor = shlex.split(args.xlsx_editor)
+
+    students = build_session(rubric_file, args.submissions)
+    # hashes of the files, so only files changed since the last run are read
+    hash_index = HashIndex()
+    rubric_sha256 = hash_index.sha256(rubric_file)
+    remaining = len(students) if args.regrade else \
+        sum(1 for student in students if is_ungraded(student, hash_index, rubric_sha256))
+    print(f'{remaining} of {len(students)} students to grade',
+          flush=True)
+    if args.debug:
+        for student in students:
+            print(f'{student.xlsx_filename}: {student.submissions}',
+                  file=sys.stderr,
+                  flush=True)
+
+    ##
+    # Grade one student while the next one is found and read ahead
+    graded = []
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        upcoming = pool.submit(next_student, students, 0, hash_index, rubric_sha256, args.regrade)
+        while True:
+            position = upcoming.result()
+            if position is None:
+                break
+            student = students[position]
+            upcoming = pool.submit(next_student, students, position + 1, hash_index, rubric_sha256, args.regrade)
+
+            print(f'\n{student.xlsx_filename}',
+                  flush=True)
+            if not student.submissions:
+                print(f'* No {args.submissions} submission found for student {student.sid}',
+                      file=sys.stderr,
+                      flush=True)
+            started = datetime.datetime.now().isoformat(timespec='seconds')
+            start = time.perf_counter()
+            viewers = []
+            try:
+                for submission in student.submissions:
+                    print(f'  {submission}',
+                          flush=True)
+                    viewers.append(subprocess.Popen(pdf_viewer + [submission]))
+                subprocess.run(xlsx_editor + [student.xlsx_filename])
+                wait_until_closed(student.xlsx_filename, time.perf_counter() - start)
+            except OSError as err:
+                print(f'* Could not open files for {student.xlsx_filename}\n   {err}',
+                      file=sys.stderr,
+                      flush=True)
+                hash_index.save()
+                exit(1)
+            seconds = time.perf_counter() - start
+            # close viewers that are still open on this student
+            for viewer in viewers:
+                if viewer.poll() is None:
+                    viewer.terminate()
+
+            record_time(student, started, seconds)
+            graded.append(seconds)
+            remaining -= 1
+            print(f'  {seconds:.0f}s for this student, {sum(graded) / len(graded):.0f}s on average,'
+                  f' {remaining} to go',
+                  flush=True)
+
+            if not args.no_pause and input('Next? [y/n] ') == 'n':
+                upcoming.cancel()
+                break
+    hash_index.save()
+
+    print(f'\n{len(graded)} students graded this session'
+          f'{f", {sum(graded) / 60:.1f} minutes" if graded else ""} (times in {Times_File})',
+          flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#! /usr/bin/env python3
+"""
+hash_index.py
+
+Content hashes of the rubric and the student xlsx files.
+
+    Telling an ungraded rubric copy from a graded file used to mean
+    comparing every file with the rubric.  The index (Index_File, in the
+    assignment directory) keeps each file's sha256 together with the size,
+    modification time and inode it had when it was hashed; a file whose
+    stat still matches is not read again.  Saving a spreadsheet changes
+    its modification time, so edited files are hashed again.
+
+    With the rubric's hash and the submit journal (see journal.py) each
+    student file is one of
+
+        remaining   still identical to the rubric
+        graded      edited, never uploaded
+        uploaded    uploaded, and unchanged since
+        modified    edited again since it was uploaded
+
+    grade_session and submit_assignment both use the index;
+    canvastools status lists the students in each state.
+
+"""
+import sys
+import argparse
+import fnmatch
+import json
+import os
+import threading
+
+from .journal import SubmissionJournal, file_sha256
+
+Index_File = 'xlsx_index.json'
+Statuses = ('remaining', 'graded', 'uploaded', 'modified')
+
+
+def find_rubric():
+    """./rubric*.xlsx, or None if there isn't exactly one"""
+    rubric_file = fnmatch.filter(os.listdir('.'), 'rubric*.xlsx')
+    return rubric_file[0] if len(rubric_file) == 1 else None
+
+
+class HashIndex:
+    """sha256 of files, recomputed only when a file's size, mtime or inode changes"""
+
+    def __init__(self, path=Index_File):
+        self.path = path
+        self.entries = {}
+        self.changed = False
+        self.lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def sha256(self, filename):
+        stat = os.stat(filename)
+        key = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        with self.lock:
+            entry = self.entries.get(filename)
+        if entry is not None and entry['key'] == key:
+            return entry['sha256']
+        sha256 = file_sha256(filename)
+        with self.lock:
+            self.entries[filename] = {'key': key, 'sha256': sha256}
+            self.changed = True
+        return sha256
+
+    def save(self):
+        """Write the index back if anything was hashed"""
+        with self.lock:
+            if not self.changed:
+                return
+            # forget files that are gone
+            entries = {filename: entry for (filename, entry) in self.entries.items() if os.path.exists(filename)}
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+            self.changed = False
+
+    def status(self, filename, rubric_sha256, journal=None):
+        """One of Statuses for a student xlsx file"""
+        sha256 = self.sha256(filename)
+        if sha256 == rubric_sha256:
+            return 'remaining'
+        uploaded = journal.lookup(filename).get('sha256') if journal is not None else None
+        if uploaded is None:
+            return 'graded'
+        return 'uploaded' if uploaded == sha256 else 'modified'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List remaining, graded, uploaded and modified students')
+    parser.add_argument('--rubric',
+                        help='rubric xlsx file for assignment (default: ./rubric*.xlsx)',
+                        default=None)
+    parser.add_argument('-names',
+                        help='List the files in each state, not just the counts',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    rubric_file = args.rubric or find_rubric()
+    if rubric_file is None:
+        print('No (single) rubric*.xlsx file: give --rubric',
+              file=sys.stderr,
+              flush=True)
+        exit(1)
+
+    index = HashIndex()
+    journal = SubmissionJournal()
+    rubric_sha256 = index.sha256(rubric_file)
+    students = {status: [] for status in Statuses}
+    for this_xlsx_filename in sorted(fnmatch.filter(os.listdir('.'), '*-*.xlsx')):
+        if this_xlsx_filename == os.path.basename(rubric_file):
+            continue
+        students[index.status(this_xlsx_filename, rubric_sha256, journal)].append(this_xlsx_filename)
+    index.save()
+
+    for status in Statuses:
+        print(f'{status:10} {len(students[status])}',
+              flush=True)
+        if args.names:
+            for this_xlsx_filename in students[status]:
+                print(f'    {this_xlsx_filename}',
+                      flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+"""
+journal.py
+
+Record of what submit_assignment has already sent to Canvas.
+
+    The journal lives in the assignment directory (Journal_File) and holds,
+    for each student's xlsx file:
+
+        sha256    content hash of the xlsx file that was uploaded as a comment
+        file_id   Canvas id of that uploaded comment file
+        score     grade that was posted
+
+    It is append-only JSON lines, one line per completed step, and later
+    lines override earlier ones, so a run that dies halfway loses at most
+    the step in progress.  On a rerun a student whose spreadsheet hash
+    matches the journal gets no new comment upload; an edited spreadsheet
+    is uploaded again.  (Whether a grade needs posting is decided against
+    the grades currently on Canvas, see submit_assignment.py.)
+
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+Journal_File = 'submit_journal.jsonl'
+
+
+def file_sha256(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SubmissionJournal:
+    """Per-student upload state, persisted as it changes"""
+
+    def __init__(self, path=Journal_File):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a torn last line from an interrupted run
+                        continue
+                    self.entries.setdefault(record.pop('filename'), {}).update(record)
+
+    def lookup(self, filename):
+        """Journal entry for filename (empty if never uploaded)"""
+        with self.lock:
+            return dict(self.entries.get(filename, {}))
+
+    def record(self, filename, **fields):
+        """Merge fields into filename's entry and append them to the journal file"""
+        fields['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with self.lock:
+            self.entries.setdefault(filename, {}).update(fields)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(dict(filename=filename, **fields)) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def comment_uploaded(self, filename, sha256):
+        """True if this exact spreadsheet is already attached as a comment"""
+        entry = self.lookup(filename)
+        return entry.get('sha256') == sha256 and entry.get('file_id') is not None
@@ -0,0 +1,171 @@
+#! /usr/bin/env python3
+"""
+pipeline.py
+
+Two-stage pipeline for the upload scripts.
+
+    Reading a spreadsheet is CPU work and talking to Canvas is mostly
+    waiting, so the two run as separate stages:
+
+        parse     a process pool (one process per core by default) reads and
+                  validates each xlsx file: score, comment, student id, ...
+        network   a thread pool sends each parsed student to Canvas as soon
+                  as its file has been parsed
+
+    The stages are joined by a bounded queue: at most queue_size files are
+    parsed ahead of the network stage, so a slow Canvas holds back parsing
+    instead of filling memory.  Results come back in filename order, and
+    each stage's throughput is kept in a StageStats.
+
+"""
+import os
+import sys
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# files parsed ahead of the network stage
+Default_Queue_Size = 32
+
+
+class StudentReport:
+    """Output and outcome of one student's file
+
+    Stages only record their messages here; main() prints each report in one
+    piece, in filename order, so concurrent runs read like serial ones.
+    Reports travel from the parse processes to the network threads, so they
+    hold plain data only.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.status = 'succeeded'
+        self.lines = []
+
+    def out(self, text):
+        self.lines.append(('stdout', text))
+
+    def err(self, text):
+        self.lines.append(('stderr', text))
+
+    def skip(self, text):
+        self.status = 'skipped'
+        self.err(text)
+
+    def fail(self, text):
+        self.status = 'failed'
+        self.err(text)
+
+    def print(self):
+        for (stream, text) in self.lines:
+            print(text, file=getattr(sys, stream), flush=True)
+
+
+class StageStats:
+    """Items through one stage and the time from its first start to its last finish"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.count = 0
+        self.started = None
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+
+    def done(self):
+        with self.lock:
+            self.count += 1
+            self.finished = time.perf_counter()
+
+    def summary(self, unit='files'):
+        elapsed = (self.finished - self.started) if self.count else 0.0
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        return f'{self.name}: {self.count} {unit} in {elapsed:.2f}s ({rate:.1f} {unit}/s, {self.workers} workers)'
+
+
+def run_pipeline(filenames, parse, send, parse_jobs=None, network_jobs=4, queue_size=Default_Queue_Size,
+                 stats=None):
+    """Yield send(parse(filename)) for each filename, in order
+
+    parse runs in a process pool, so it must be a module-level function (use
+    functools.partial for its other arguments) and return something
+    picklable; send runs in network_jobs threads of this process.  Neither
+    should raise: an exception that escapes is re-raised here when its
+    filename's turn comes.  parse_jobs defaults to one process per CPU.
+    If stats is a list, the StageStats of both stages are appended to it.
+    """
+    parse_jobs = max(1, parse_jobs or os.cpu_count() or 1)
+    network_jobs = max(1, network_jobs)
+    queue_size = max(1, queue_size)
+    parse_stats = StageStats('parse', parse_jobs)
+    network_stats = StageStats('network', network_jobs)
+    if stats is not None:
+        stats.extend([parse_stats, network_stats])
+
+    # parsed files waiting for the network stage; window keeps the number
+    # being parsed or waiting at queue_size, so ready.put() never blocks
+    ready = queue.Queue(maxsize=queue_size)
+    window = threading.Semaphore(queue_size)
+    results = {}
+    finished = threading.Condition()
+
+    def parsed(index, future):
+        parse_stats.done()
+        ready.put((index, future))
+
+    def feed():
+        submitted = 0
+        try:
+            with ProcessPoolExecutor(max_workers=parse_jobs) as pool:
+                for filename in filenames:
+                    window.acquire()
+                    parse_stats.start()
+                    future = pool.submit(parse, filename)
+                    future.add_done_callback(lambda future, index=submitted: parsed(index, future))
+                    submitted += 1
+        except Exception as err:
+            # the pool itself broke: fail whatever was never submitted
+            with finished:
+                results.update({index: (None, err) for index in range(submitted, len(filenames))})
+                finished.notify_all()
+        for _ in range(network_jobs):
+            ready.put(None)
+
+    def network():
+        while True:
+            item = ready.get()
+            if item is None:
+                return
+            window.release()
+            (index, future) = item
+            network_stats.start()
+            try:
+                result = (send(future.result()), None)
+            except Exception as err:
+                result = (None, err)
+            network_stats.done()
+            with finished:
+                results[index] = result
+                finished.notify_all()
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=network, daemon=True) for _ in range(network_jobs)]
+    for thread in threads:
+        thread.start()
+
+    for index in range(len(filenames)):
+        with finished:
+            finished.wait_for(lambda: index in results)
+            (result, err) = results.pop(index)
+        if err is not None:
+            raise err
+        yield result
+
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,154 @@
+#! /usr/bin/env python3
+"""
+response_cache.py
+
+On-disk cache of Canvas API GET responses.
+
+    Assignment lists, quiz questions and rosters rarely change during a
+    grading week, yet every run used to download them again.  CanvasClient
+    consults a ResponseCache before each GET of an endpoint listed in
+    Default_TTLs:
+
+        - younger than the endpoint's TTL: served from disk, no request sent
+        - older: revalidated with If-None-Match <stored ETag>; a 304 reply
+          refreshes the entry and the stored body is used
+
+    Entries are keyed by URL, query parameters and (a digest of) the API
+    token, stored one JSON file per entry, and evicted least recently used
+    first once the cache grows past max_bytes.
+
+    Cache directory
+        $CANVASTOOLS_CACHE_DIR, else $XDG_CACHE_HOME/canvastools,
+        else ~/.cache/canvastools.  Scripts take --no-cache to bypass it.
+
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+# (URL path pattern, seconds an entry is served without revalidation).
+# 0 means always revalidate with the ETag; endpoints not listed are not cached.
+# Assignment lists are always revalidated: a stale list would miss an
+# assignment created since, and the scripts would stop with "Could not find
+# assignment".
+Default_TTLs = (
+    (r'/courses/\d+/assignments/?$', 0),
+    (r'/courses/\d+/quizzes/\d+/questions/?$', 24 * 3600),
+    (r'/courses/\d+/(users|sections|enrollments|students)/?$', 6 * 3600),
+    (r'/assignments/\d+/submissions/?$', 0),
+    (r'/quizzes/\d+/submissions/?$', 0),
+)
+Default_Max_Bytes = 64 * 1024 * 1024
+
+# response headers worth keeping (Link is needed for pagination)
+Stored_Headers = ('Content-Type', 'ETag', 'Link')
+
+
+def default_cache_dir():
+    if 'CANVASTOOLS_CACHE_DIR' in os.environ:
+        return os.environ['CANVASTOOLS_CACHE_DIR']
+    cache_home = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'canvastools')
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of GET responses with per-endpoint TTLs"""
+
+    def __init__(self, cache_dir=None, ttls=Default_TTLs, max_bytes=Default_Max_Bytes):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.ttls = [(re.compile(pattern), ttl) for (pattern, ttl) in ttls]
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def ttl(self, url):
+        """Seconds url may be served from cache without revalidation, or None if not cacheable"""
+        path = url.split('?', 1)[0]
+        for (pattern, ttl) in self.ttls:
+            if pattern.search(path):
+                return ttl
+        return None
+
+    def path(self, namespace, url, params):
+        key = json.dumps([namespace, url, params], sort_keys=True, default=str)
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+    def lookup(self, namespace, url, params):
+        """Stored entry for this request, or None"""
+        path = self.path(namespace, url, params)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # access time for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    @staticmethod
+    def is_fresh(entry, ttl):
+        return time.time() - entry['stored_at'] < ttl
+
+    def store(self, namespace, url, params, response):
+        """Save a 200 response"""
+        entry = {'url': url,
+                 'stored_at': time.time(),
+                 'headers': {name: response.headers[name] for name in Stored_Headers if name in response.headers},
+                 'body': response.text}
+        self.write(self.path(namespace, url, params), entry)
+        self.evict()
+
+    def refresh(self, namespace, url, params, entry):
+        """Restart an entry's TTL after a 304 Not Modified"""
+        entry['stored_at'] = time.time()
+        self.write(self.path(namespace, url, params), entry)
+
+    def write(self, path, entry):
+        # write then rename so concurrent readers never see a partial file
+        (fd, temp_path) = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for (_, size, _) in entries)
+            for (_, size, name) in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+                total -= size
+
+    @staticmethod
+    def response(entry):
+        """Rebuild a requests.Response from a stored entry"""
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = 'utf-8'
+        response._content = entry['body'].encode('utf-8')
+        return response
@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+"""
+startup_budget.py
+
+Startup-time regression check for the canvastools command.
+
+    TAs run these commands dozens of times per grading session, so
+    "canvastools <subcommand> --help" must not import anything heavy.
+    For every subcommand this runs
+
+        python3 -X importtime -m canvastools <subcommand> --help
+
+    and fails (exit status 1) if
+        - any of Heavy_Modules was imported, or
+        - the imports done after interpreter startup (canvastools and
+          everything it pulls in) took longer than --budget milliseconds.
+
+    Usage:  python3 -m canvastools.startup_budget [--budget MS] [subcommand ...]
+
+"""
+import sys
+import argparse
+import re
+import subprocess
+
+from .cli import Subcommands
+
+Default_Budget_ms = 100.0
+Heavy_Modules = ('requests', 'urllib3', 'numpy', 'pandas', 'openpyxl')
+
+Import_Line = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def import_profile(subcommand):
+    """[(module, cumulative_us, depth)] for canvastools <subcommand> --help, in completion order"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'canvastools', subcommand, '--help'],
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE,
+                            text=True)
+    profile = []
+    for line in result.stderr.splitlines():
+        match = Import_Line.match(line)
+        if match:
+            profile.append((match.group(4), int(match.group(2)), len(match.group(3)) // 2))
+    return profile
+
+
+def check_subcommand(subcommand, budget_ms):
+    """List of problems with subcommand's startup (empty if within budget)"""
+    profile = import_profile(subcommand)
+    problems = []
+
+    heavy = sorted({module.split('.')[0] for (module, _, _) in profile} & set(Heavy_Modules))
+    if heavy:
+        problems.append(f'imports {", ".join(heavy)}')
+
+    ##
+    # Interpreter startup (site, encodings, ...) finishes before canvastools
+    # is imported; only count top-level imports from there on
+    names = [module for (module, _, _) in profile]
+    start = names.index('canvastools') if 'canvastools' in names else 0
+    elapsed_ms = sum(cumulative for (_, cumulative, depth) in profile[start:] if depth == 0) / 1000
+    if elapsed_ms > budget_ms:
+        problems.append(f'imports took {elapsed_ms:.1f} ms (budget {budget_ms:.1f} ms)')
+
+    print(f'{subcommand:20} {elapsed_ms:7.1f} ms  {"FAIL" if problems else "ok"}',
+          flush=True)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check canvastools startup time')
+    parser.add_argument('--budget',
+                        help=f'import time budget per subcommand in ms (default: {Default_Budget_ms})',
+                        type=float,
+                        default=Default_Budget_ms)
+    parser.add_argument('subcommands',
+                        help='subcommands to check (default: all)',
+                        nargs='*')
+    args = parser.parse_args()
+
+    failed = False
+    for subcommand in args.subcommands or sorted(Subcommands):
+        for problem in check_subcommand(subcommand, args.budget):
+            print(f'* {subcommand}: {problem}',
+                  file=sys.stderr,
+                  flush=True)
+            failed = True
+
+    if failed:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,752 @@
+#! /usr/bin/env python3
+"""
+submit_assignment.py
+
+Assumptions:
+
+Excel files:
+There is an excel file for each student with a score_label and a score_column
+
+    The names of the column and the first entry in the score row
+    are either default (Deductions and Score, resp.) or given by
+    the appropriate entries in the config file
+
+    The student's score for the assignment score_row, score_column entry
+
+The excel filenames have form   NNNN-SSSS-CCCC.xlsx
+where NNNN is some representation of the student name and course number,
+SSSS is the student's canvas_student_id, and
+CCCC is the canvas_course_id in which the student is registered.
+
+config file
+        json dictionary with entries course_id and assignment_id
+        and possibly having entries score_column and score_label
+
+    API_token file
+        Canvas API token is stored in a file (default name: API_token)
+
+"""
+import sys
+import argparse
+import json
+import os
+import fnmatch
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from . import pipeline
+from .canvas_client import CanvasClient, read_token, resolve_base_url
+from .canvas_data import Backends, make_backend, size_matches
+from .response_cache import ResponseCache
+from .journal import Journal_File, SubmissionJournal, file_sha256
+from .hash_index import HashIndex, find_rubric
+from .file_watch import make_watcher, settled_changes
+from .comment_upload import CommentQueue, CommentUploader, Queue_File
+from .xlsx_reader import read_score
+
+Software_Version = 0.5
+
+
+class StudentReport(pipeline.StudentReport):
+    """Output and outcome of one student's upload"""
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        # filled in by parse_student()
+        self.course_id = None
+        self.sid = None
+        self.score = None
+        self.sha256 = None
+        # set in -bulk mode for post_grades_bulk()
+        self.post_in_bulk = False
+        # (score on Canvas, new score) when the grade needs writing
+        self.grade_change = None
+        # grade PUTs sent, and the attempt count they covered
+        self.grade_writes = 0
+        self.attempts = 0
+
+
+class Course:
+    """One section's assignment: where its students' grades and comments go"""
+
+    def __init__(self, course_id, assignment, submissions_uri, submissions):
+        self.course_id = course_id
+        self.assignment = assignment
+        self.submissions_uri = submissions_uri
+        # fetch_submissions(), kept up to date with the grades posted
+        self.submissions = submissions
+
+
+def is_student_file(filename):
+    """True for a student's xlsx file (not an editor's lock file)"""
+    return fnmatch.fnmatch(filename, '*-*.xlsx') and not filename.startswith(('~$', '.~lock'))
+
+
+def fetch_submissions(backend, course_id, assignment_id):
+    """Current submissions for the assignment in course_id (with their comments), keyed by (str) user id"""
+    return {str(submission['user_id']): submission
+            for submission in backend.submissions(course_id, assignment_id)}
+
+
+def resolve_course(canvas, backend, course_id, assignment):
+    """Course for one section of the config's quiz_ids (runs in a thread per section)"""
+    return Course(course_id,
+                  assignment,
+                  f'{canvas.api_base}courses/{course_id}/assignments/{assignment["id"]}/submissions',
+                  fetch_submissions(backend, course_id, assignment['id']))
+
+
+def canvas_score(submission):
+    """Grade Canvas shows for submission (before late penalties), or None"""
+    if submission is None:
+        return None
+    score = submission.get('entered_score', submission.get('score'))
+    return None if score is None else float(score)
+
+
+def attached_comment_file(submission, filename, sha256, journal):
+    """The attachment on submission's comments that already is filename, or None
+
+    Canvas doesn't give the content hash of an attachment, so a match is
+    an attachment with the same name and size (as rounded by GraphQL, see
+    size_matches), unless the journal says it is an upload of different
+    content (an edit that kept the size).
+    """
+    if submission is None:
+        return None
+    entry = journal.lookup(filename)
+    stale_file_id = entry.get('file_id') if entry.get('sha256') != sha256 else None
+    name = os.path.basename(filename)
+    size = os.path.getsize(filename)
+    for comment in submission.get('submission_comments') or []:
+        for attachment in comment.get('attachments') or []:
+            if attachment.get('id') == stale_file_id:
+                continue
+            if name in (attachment.get('display_name'), attachment.get('filename')) and \
+                    size_matches(attachment.get('size'), size):
+                return attachment
+    return None
+
+
+def grade_differs(submission, score):
+    """True unless Canvas already has score as the grade of the current attempt"""
+    current = canvas_score(submission)
+    if current is None or submission.get('grade_matches_current_submission') is False:
+        return True
+    return abs(current - score) > 1e-6
+
+
+def parse_student(args, config, score_label, score_column, this_xlsx_filename):
+    """Parse stage: read and check one student's xlsx file (runs in a worker process)"""
+    report = StudentReport(this_xlsx_filename)
+    try:
+        read_student(args, config, score_label, score_column, report)
+    except Exception as err:
+        report.fail(f'* Unexpected failure for [{this_xlsx_filename}]\n   {err}')
+    return report
+
+
+def read_student(args, config, score_label, score_column, report):
+    this_xlsx_filename = report.filename
+    report.out(f'Working on {this_xlsx_filename}')
+
+    # identify course (CCCC in NNNN-SSSS-CCCC.xlsx)
+    report.course_id = this_xlsx_filename[this_xlsx_filename.rfind('-') + 1:this_xlsx_filename.rfind('.xlsx')]
+    if args.debug:
+        report.err(f'this_course_id:{report.course_id}')
+
+    ##
+    # extract score from the xlsx file
+    if not args.comments_only:
+        try:
+            score = read_score(this_xlsx_filename, score_label, score_column)
+        except Exception as err:
+            report.fail(f'* Cannot read excel file [{this_xlsx_filename}]\n   {err}')
+            return
+        if score is None:
+            report.fail(f'* Score not found for [{this_xlsx_filename}]\n'
+                        f'Looking for column header "{score_column}" and row header "{score_label}"')
+            return
+        if args.debug:
+            report.out(f'Score is {score}')
+        if 'factor' in config.keys():
+            score = score * config['factor']
+        report.score = float(score)
+
+    ##
+    # grab Canvas student ID from filename
+
+    report.sid = this_xlsx_filename[re.search(r'\d', this_xlsx_filename).start():this_xlsx_filename.rfind('-')]
+    if args.debug:
+        report.err(f'**student_canvas_id: {report.sid}')
+
+    report.sha256 = file_sha256(this_xlsx_filename)
+
+
+def submit_student(canvas, args, journal, courses, comment_queue, report):
+    """Network stage: post the grade and queue the comment file for one parsed student"""
+    if report.status != 'succeeded':
+        return report
+    try:
+        upload_student(canvas, args, journal, courses, comment_queue, report)
+    except Exception as err:
+        report.fail(f'* Unexpected failure for [{report.filename}]\n   {err}')
+    return report
+
+
+def post_grade(canvas, args, report, submission_uri, score):
+    """PUT the posted grade; False if the request failed
+
+    The submissions/{sid} endpoint is not attempt-specific: posted_grade
+    always lands on the student's current attempt, and that is the grade the
+    gradebook (and a "highest grade" policy) sees.  Writing 0 for each
+    earlier attempt first, as this used to, only repeated the same PUT, so
+    one write per student is enough whatever the attempt count.  Per-attempt
+    quiz scores go through the quiz submissions API (see submit_grades.py).
+    """
+    score = float(score)
+    if args.debug:
+        report.err(f'**submission_uri {submission_uri}')
+    if args.n:
+        report.out(f'***No action for {report.filename}, score: {score}')
+        return True
+
+    params = {'submission[posted_grade]': str(score)}
+    response = None
+    try:
+        report.grade_writes += 1
+        response = canvas.put(submission_uri,
+                              params=params)
+        response.raise_for_status()
+        if args.debug:
+            report.out(f'request: {submission_uri}:{params}')
+        report.out(f'  Uploaded grade {score} for {report.filename}')
+    except Exception as err:
+        report.fail(f'**http request failed {submission_uri}\n'
+                    f'response: {response.text if response is not None else None}\n   {err}')
+        return False
+    return True
+
+
+def upload_student(canvas, args, journal, courses, comment_queue, report):
+    this_xlsx_filename = report.filename
+    this_sid = report.sid
+    score = report.score
+
+    ##
+    # Everything for this student goes to their own section
+    course = courses.get(report.course_id)
+    if course is None:
+        report.fail(f'* Course {report.course_id} of [{this_xlsx_filename}] is not in the config quiz_ids')
+        return
+    submissions = course.submissions
+    submissions_uri = course.submissions_uri
+
+    ##
+    # Only write grades Canvas doesn't already have, and skip comment
+    # files an earlier run already uploaded (see journal.py)
+    this_sha256 = report.sha256
+    need_grade = not args.comments_only and \
+        (args.reupload or grade_differs(submissions.get(this_sid), score))
+    if need_grade:
+        report.grade_change = (canvas_score(submissions.get(this_sid)), score)
+    elif not args.comments_only:
+        report.out(f'  Grade {score} already on Canvas for {this_xlsx_filename}')
+    need_comment = args.reupload or not journal.comment_uploaded(this_xlsx_filename, this_sha256)
+    if need_comment and not args.reupload:
+        ##
+        # Nor files already attached on Canvas (by a run that lost its
+        # journal, or another machine)
+        attachment = attached_comment_file(submissions.get(this_sid), this_xlsx_filename, this_sha256, journal)
+        if attachment is not None:
+            need_comment = False
+            report.out(f'  Comment file already on Canvas: {this_xlsx_filename}')
+            if not args.n:
+                journal.record(this_xlsx_filename, sha256=this_sha256, file_id=attachment['id'])
+                # an upload queued by an earlier run isn't needed any more
+                comment_queue.discard(this_xlsx_filename)
+    if not need_grade and not need_comment:
+        report.status = 'skipped'
+        report.out(f'  Unchanged since last upload: {this_xlsx_filename}')
+        return
+    if args.debug:
+        report.err(f'**journal: need_grade {need_grade}, need_comment {need_comment}')
+
+    if need_grade:
+        ##
+        # First, try to upload the grade
+
+        ##
+        # find this student's submission (prefetched by fetch_submissions)
+        assignment_entry = submissions.get(this_sid)
+        if assignment_entry is None:
+            report.fail(f'\n*** Could not find assignment entry for {this_xlsx_filename}\n'
+                        f'   no submission for student {this_sid}\n')
+            return
+
+        ##
+        # Find assignment attempts
+        submission_id = assignment_entry["id"]
+        attempt = assignment_entry["attempt"]
+        if args.debug:
+            report.err(f'**submission_id: {submission_id}, attempt is {attempt}')
+        if attempt is None:
+            report.skip(f'\n*** No attempts by this student {this_xlsx_filename}\n ')
+            return
+        report.attempts = attempt
+        if args.bulk:
+            ##
+            # Only record the grade here: post_grades_bulk() sends every
+            # student's grade in one update_grades request once the pool is done
+            report.post_in_bulk = True
+            if args.n:
+                report.out(f'***No action for {this_xlsx_filename}, score: {report.score}')
+        elif not post_grade(canvas, args, report, f'{submissions_uri}/{this_sid}', score):
+            return
+        elif not args.n:
+            journal.record(this_xlsx_filename, sid=this_sid, score=score)
+            # a later save of this file (--watch) is compared with the grade just posted
+            submissions[this_sid] = dict(assignment_entry, entered_score=score, grade_matches_current_submission=True)
+
+    ##
+    # Now queue the excel comment file: it is uploaded once all the
+    # grades are posted (see comment_upload.py)
+    comment_upload_uri = f'{submissions_uri}/{this_sid}'
+
+    if args.debug:
+        report.err(f'**comment_upload_uri: {comment_upload_uri}')
+
+    if need_comment and not args.n:
+        comment_queue.put(this_xlsx_filename, comment_upload_uri)
+        report.out(f'  Queued comment file {this_xlsx_filename}')
+
+
+def post_grades_bulk(canvas, backend, args, journal, courses, reports):
+    """Post every recorded grade in one update_grades request per section, the sections in parallel"""
+    by_course = {}
+    for report in reports:
+        if report.status == 'succeeded' and report.post_in_bulk:
+            by_course.setdefault(report.course_id, []).append(report)
+    with ThreadPoolExecutor(max_workers=max(1, len(by_course))) as pool:
+        futures = [pool.submit(post_course_grades, canvas, backend, args, journal, courses[course_id], graded)
+                   for (course_id, graded) in by_course.items()]
+        for future in futures:
+            future.result()
+
+
+def post_course_grades(canvas, backend, args, journal, course, graded):
+    """One section's update_grades request, waited on until Canvas has applied it
+
+    A completed Progress doesn't say which grades were applied, so the
+    section's submissions are fetched again afterwards: a student whose
+    grade on Canvas isn't the one sent fails and stays out of the journal.
+    """
+    grade_data = {f'grade_data[{report.sid}][posted_grade]': str(report.score) for report in graded}
+    update_grades_uri = f'{course.submissions_uri}/update_grades'
+    if args.debug:
+        print(f'**update_grades_uri {update_grades_uri}: {grade_data}',
+              file=sys.stderr,
+              flush=True)
+
+    progress = None
+    try:
+        response = canvas.post(update_grades_uri,
+                               data=grade_data)
+        response.raise_for_status()
+        progress = canvas.wait_for_progress(json.loads(response.text))
+        assert progress['workflow_state'] == 'completed', \
+            f'update_grades {progress["workflow_state"]}: {progress.get("message")}'
+        course.submissions = fetch_submissions(backend, course.course_id, course.assignment['id'])
+    except Exception as err:
+        print(f'**bulk grade update failed {update_grades_uri}\n   {err}',
+              file=sys.stderr,
+              flush=True)
+        for report in graded:
+            report.status = 'failed'
+            print(f'* Grade {report.score} not posted for [{report.filename}]',
+                  file=sys.stderr,
+                  flush=True)
+        return
+
+    for report in graded:
+        posted = canvas_score(course.submissions.get(report.sid))
+        if posted is None or abs(posted - report.score) > 1e-6:
+            report.status = 'failed'
+            print(f'* Grade {report.score} not applied for [{report.filename}] (Canvas has {posted})',
+                  file=sys.stderr,
+                  flush=True)
+            continue
+        journal.record(report.filename, sid=report.sid, score=report.score)
+        print(f'  Uploaded grade {report.score} for {report.filename}',
+              flush=True)
+
+
+def watch_uploads(watcher, canvas, args, config, journal, courses, comment_queue, score_label, score_column,
+                  hash_index=None, rubric_sha256=None):
+    """--watch: upload each student's xlsx file once it has been saved, until Ctrl-C
+
+    watcher is made before the first pass lists the files, so a file saved
+    while that pass runs is uploaded again here.
+    """
+    print(f'\nWatching for saved xlsx files ({watcher.name}), '
+          f'Ctrl-C to stop',
+          flush=True)
+    reports = []
+    print_lock = threading.Lock()
+    # one upload at a time per file; a save during an upload waits its turn
+    file_locks = {}
+
+    def upload(this_xlsx_filename):
+        with file_locks[this_xlsx_filename]:
+            report = parse_student(args, config, score_label, score_column, this_xlsx_filename)
+            report = submit_student(canvas, args, journal, courses, comment_queue, report)
+        with print_lock:
+            report.print()
+            reports.append(report)
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        try:
+            for saved in settled_changes(watcher, is_student_file, args.debounce):
+                for this_xlsx_filename in saved:
+                    if hash_index is not None and \
+                            hash_index.status(this_xlsx_filename, rubric_sha256) == 'remaining':
+                        continue
+                    file_locks.setdefault(this_xlsx_filename, threading.Lock())
+                    pool.submit(upload, this_xlsx_filename)
+        except KeyboardInterrupt:
+            print('\nStopped watching; finishing the uploads in progress',
+                  flush=True)
+        finally:
+            watcher.close()
+            if hash_index is not None:
+                hash_index.save()
+
+    print(f'{len(reports)} uploads while watching: '
+          f'{sum(1 for report in reports if report.status == "succeeded")} succeeded, '
+          f'{sum(1 for report in reports if report.status == "skipped")} skipped, '
+          f'{sum(1 for report in reports if report.status == "failed")} failed',
+          flush=True)
+    for report in reports:
+        if report.status == 'failed':
+            print(f'  failed: {report.filename}',
+                  flush=True)
+
+
+def main():
+    access_token = None
+    config = None
+
+    parser = argparse.ArgumentParser(description='Submit a graded Canvas assignment')
+    parser.add_argument('--config',
+                        help='file containing config info',
+                        default=None)
+    parser.add_argument('--token',
+                        help='Canvas Access Token File',
+                        default='../API_token')
+    parser.add_argument('--canvas_url',
+                        help='Canvas base URL (default: config "canvas_url" or https://ufl.instructure.com)',
+                        default=None)
+    parser.add_argument('--rubric',
+                        help='rubric xlsx file; copies of it that were never edited are not uploaded '
+                             '(default: ./rubric*.xlsx)',
+                        default=None)
+    parser.add_argument('-allow_untouched',
+                        help='Upload xlsx files even if they are still identical to the rubric',
+                        action='store_true')
+    parser.add_argument('-bulk',
+                       help='Post all grades in one update_grades request per section',
+                       action='store_true')
+    parser.add_argument('-comments_only',
+                       help='Only submit comments -- no grades',
+                       action='store_true')
+    parser.add_argument('--jobs',
+                        help='Number of students to upload concurrently (default: 4)',
+                        type=int,
+                        default=4)
+    parser.add_argument('--parse_jobs',
+                        help='Number of processes reading xlsx files (default: one per CPU)',
+                        type=int,
+                        default=None)
+    parser.add_argument('--watch', '-watch',
+                        dest='watch',
+                        help='After uploading, keep running and upload each xlsx file as soon as it is saved',
+                        action='store_true')
+    parser.add_argument('--debounce',
+                        help='With --watch: seconds a file must stay unchanged before it is uploaded (default: 2)',
+                        type=float,
+                        default=2.0)
+    parser.add_argument('--api',
+                        help='How to read assignments and submissions: rest or graphql (default: rest)',
+                        choices=Backends,
+                        default='rest')
+    parser.add_argument('--no-cache', '-no_cache',
+                        dest='no_cache',
+                        help='Ignore the on-disk Canvas metadata cache',
+                        action='store_true')
+    parser.add_argument('-debug',
+                        help='Set verbose debugging mode',
+                        action='store_true')
+    parser.add_argument('-force',
+                        help='Perform action without user acknowledgement',
+                        action='store_true')
+    parser.add_argument('-reupload',
+                        help=f'Ignore {Journal_File} and send every grade and comment again',
+                        action='store_true')
+    parser.add_argument('-n',
+                        help='Dry run: do everything but submit grades',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    if args.watch and args.bulk:
+        print('-bulk posts grades once at the end; it does not work with --watch',
+              file=sys.stderr,
+              flush=True)
+        exit(1)
+
+    if not args.config:
+        config_file = fnmatch.filter(os.listdir('.'), 'config*')
+        assert not (len(config_file) < 1), 'No config file!'
+        assert not (len(config_file) > 1), f'Too many config files:{config_file}'
+        config_file = config_file[0]
+    else:
+        config_file = args.config
+
+    try:
+        with open(config_file) as f:
+            config = json.load(f)
+            f.close()
+    except Exception as err:
+        print(f'Unable to open or parse config file: [{config_file}]: {err}',
+              file=sys.stderr,
+              flush=True)
+        exit(1)
+
+    ##
+    # check software version
+
+    config_software_version = config['software_version']
+    assert Software_Version >= config_software_version, \
+        f'Software version ({str(Software_Version)}) too low. ' \
+        f'Config file requires {str(config_software_version)}'
+
+    score_column = config['score_column'] if 'score_column' in config.keys() else 'Deductions'
+    score_label = config['score_label'] if 'score_label' in config.keys() else 'Score'
+
+    ##
+    # read Canvas token from file
+    try:
+        access_token = read_token(args.token)
+    except Exception as err:
+        print(f"Couldn't read access token file {args.token}\n   {err}",
+              file=sys.stderr,
+              flush=True)
+        exit(2)
+
+    # Prepare information for associating assignments with courses
+    assignment_map = config['quiz_ids']
+    canvas = CanvasClient(access_token, base_url=resolve_base_url(args.canvas_url, config),
+                          cache=None if args.no_cache else ResponseCache())
+
+    ##
+    # Resolve every section at once: its assignment, and all its current
+    # submissions (each student's submission and attempt, so only changed
+    # grades are written, and the comment files already attached, so those
+    # aren't uploaded again).  Students are routed by the course in their
+    # filename.
+    backend = make_backend(canvas, args.api, args.jobs)
+    try:
+        assignments = backend.find_assignments({course_id: str(quiz_id)
+                                                for (course_id, quiz_id) in assignment_map.items()})
+    except Exception as err:
+        print(f'* Could not look up the assignments of courses {", ".join(assignment_map)}\n   {err}',
+              file=sys.stderr,
+              flush=True)
+        exit(254)
+    for (course_id, assignment) in assignments.items():
+        if args.debug:
+            print(f'asst_entry (course {course_id}):{assignment}',
+                  file=sys.stderr,
+                  flush=True)
+        if assignment is None:
+            print(f'* Could not find assignment {assignment_map[course_id]} in course {course_id}',
+                  file=sys.stderr,
+                  flush=True)
+            exit(254)
+
+    courses = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(assignments))) as pool:
+        futures = {course_id: pool.submit(resolve_course, canvas, backend, course_id, assignment)
+                   for (course_id, assignment) in assignments.items()}
+        for (course_id, future) in futures.items():
+            try:
+                courses[course_id] = future.result()
+            except Exception as err:
+                print(f'* Could not fetch the submissions of course {course_id}\n   {err}',
+                      file=sys.stderr,
+                      flush=True)
+                exit(254)
+
+    ##
+    # Get verification of correct exercise
+    # (one time only if they match across sections)
+    config_name = config['assignment_name']
+    exercise_names = {}
+    for course in courses.values():
+        exercise_names.setdefault(course.assignment['name'], []).append(course.course_id)
+    if not args.force:
+        for (exercise_name, course_ids) in exercise_names.items():
+            if input(f'\nExercise name is: {exercise_name}\nConfigured name (Course {", ".join(course_ids)}):  '
+                     f'{config_name}\n\nContinue? [y/n] ') != 'y':
+                exit(1)
+
+    ##
+    # Upload each student's xlsx file.
+    # Students are independent, so up to args.jobs of them are in flight at once.
+    # (--watch starts watching first: saves during this pass aren't missed)
+    watcher = make_watcher('.') if args.watch else None
+    excel_files = sorted(filter(is_student_file, os.listdir('.')))
+
+    journal = SubmissionJournal()
+    reports = []
+    stage_stats = []
+
+    ##
+    # Never upload a rubric copy nobody has graded (see hash_index.py)
+    rubric_file = args.rubric or find_rubric()
+    hash_index = None
+    rubric_sha256 = None
+    if rubric_file is not None and not args.allow_untouched:
+        hash_index = HashIndex()
+        rubric_sha256 = hash_index.sha256(rubric_file)
+        untouched = {this_xlsx_filename for this_xlsx_filename in excel_files
+                     if hash_index.status(this_xlsx_filename, rubric_sha256) == 'remaining'}
+        hash_index.save()
+        for this_xlsx_filename in sorted(untouched):
+            report = StudentReport(this_xlsx_filename)
+            report.skip(f'* Not graded yet (identical to {rubric_file}): {this_xlsx_filename}')
+            report.print()
+            reports.append(report)
+        excel_files = [this_xlsx_filename for this_xlsx_filename in excel_files
+                       if this_xlsx_filename not in untouched]
+    elif rubric_file is None and args.debug:
+        print('**no rubric file: untouched rubric copies are not detected',
+              file=sys.stderr,
+              flush=True)
+
+    ##
+    # Comment files wait in a queue on disk (Queue_File) until they are
+    # uploaded; whatever an earlier run left there goes first
+    uploader = CommentUploader(canvas, args.jobs)
+    comment_queue = CommentQueue(uploader, journal)
+    if len(comment_queue):
+        print(f'{len(comment_queue)} comment files left in {Queue_File} by an earlier run',
+              flush=True)
+
+    ##
+    # xlsx files are parsed in a process pool while the students parsed so far
+    # have their grades posted (see pipeline.py)
+    start = time.monotonic()
+    for report in pipeline.run_pipeline(excel_files,
+                                        partial(parse_student, args, config, score_label, score_column),
+                                        lambda report: submit_student(canvas, args, journal, courses,
+                                                                      comment_queue, report),
+                                        parse_jobs=args.parse_jobs,
+                                        network_jobs=args.jobs,
+                                        stats=stage_stats):
+        report.print()
+        reports.append(report)
+
+    if args.bulk and not args.n and not args.comments_only:
+        post_grades_bulk(canvas, backend, args, journal, courses, reports)
+    grades_seconds = time.monotonic() - start
+
+    outcomes = {'succeeded': [], 'skipped': [], 'failed': []}
+    for report in reports:
+        outcomes[report.status].append(report.filename)
+
+    ##
+    # Grade changes (in -n mode, what would be sent)
+    changes = [report for report in reports if report.grade_change is not None]
+    if changes and not args.comments_only:
+        print(f'\nGrade changes{" (plan, nothing sent)" if args.n else ""}:',
+              flush=True)
+        for report in changes:
+            (current, new) = report.grade_change
+            print(f'  {report.filename}: {"-" if current is None else current} -> {new}'
+                  f'{"" if args.n or report.status == "succeeded" else f"  ({report.status})"}',
+                  flush=True)
+
+    ##
+    # Grade write traffic (one PUT per attempt is what this used to cost)
+    if not args.comments_only and not args.bulk and not args.n:
+        grade_writes = sum(report.grade_writes for report in reports)
+        per_attempt_writes = sum(report.attempts for report in reports if report.grade_change is not None)
+        print(f'\nGrade requests: {grade_writes} sent'
+              f' ({per_attempt_writes} with one write per attempt)',
+              flush=True)
+
+    ##
+    # Summary
+    print(f'\n{len(reports)} students: {len(outcomes["succeeded"])} succeeded, '
+          f'{len(outcomes["skipped"])} skipped, {len(outcomes["failed"])} failed',
+          flush=True)
+    for status in ('skipped', 'failed'):
+        for this_xlsx_filename in outcomes[status]:
+            print(f'  {status}: {this_xlsx_filename}',
+                  flush=True)
+
+    ##
+    # Throughput of each pipeline stage
+    print('',
+          flush=True)
+    for stats in stage_stats:
+        print(f'  {stats.summary()}',
+              flush=True)
+    if not args.comments_only:
+        print(f'  grades posted {grades_seconds:.2f}s after the first file was read',
+              flush=True)
+
+    ##
+    # Grades are all in: now the comment files
+    if not args.n:
+        print(f'\nUploading {len(comment_queue)} comment files'
+              f'{" in the background while watching" if args.watch else ""}',
+              flush=True)
+        comment_queue.start(args.jobs)
+
+    if args.watch:
+        watch_uploads(watcher, canvas, args, config, journal, courses, comment_queue, score_label, score_column,
+                      hash_index, rubric_sha256)
+
+    ##
+    # Wait for the comment files; Ctrl-C leaves the rest queued for the next run
+    try:
+        comment_queue.close()
+    except KeyboardInterrupt:
+        print('\nStopped uploading comment files',
+              flush=True)
+    uploader.close()
+    if not args.n:
+        print(f'\nComment files: {comment_queue.uploaded} uploaded, {len(comment_queue.failed)} failed',
+              flush=True)
+        if comment_queue.finished_at is not None:
+            print(f'  last one done {comment_queue.finished_at - start:.2f}s after the first file was read',
+                  flush=True)
+        for this_xlsx_filename in sorted(comment_queue.failed):
+            print(f'  failed: {this_xlsx_filename}',
+                  flush=True)
+    if len(comment_queue):
+        print(f'{len(comment_queue)} comment files left in {Queue_File}: run submit_assignment again to upload them',
+              flush=True)
+
+    if args.n:
+        print('No upload actions actually performed',
+              flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+#! /usr/bin/env python3
+"""
+submit_grades.py
+
+Assumptions:
+
+   Excel files:
+       There is an excel file for each student that contains two specific columns
+       Category and Deductions
+       The student's score is in the Row having Category 'Score' in the Deductions column
+
+       The excel filename has form   XXXXX,#####.xlsx
+       where XXXXX is some representation of the student name and
+       ##### is the students canvas_student_id
+
+    config file
+        json dictionary with entries course_id and quiz_id
+
+    API_token file
+        Canvas API token is stored in a file (default name: API_token)
+
+"""
+import sys
+import argparse
+import json
+import os
+import fnmatch
+from functools import partial
+
+from . import pipeline
+from .canvas_client import CanvasClient, read_token, resolve_base_url
+from .response_cache import ResponseCache
+from .xlsx_reader import find_score, read_rows, render_csv
+
+Software_Version = 0.4
+
+
+def index_quiz_submissions(submissions):
+    """Quiz submissions keyed by user id, keeping each student's latest attempt"""
+    index = {}
+    for submission in submissions:
+        if 'user_id' not in submission:
+            continue
+        latest = index.get(submission['user_id'])
+        if latest is None or (submission['attempt'] or 0) >= (latest['attempt'] or 0):
+            index[submission['user_id']] = submission
+    return index
+
+
+def attempt_scores(attempt, score, question_0, question_1=None):
+    """quiz_submissions entry giving question_0 score (and question_1 zero) on attempt"""
+    questions = {str(question_0): {"score": score, "comment": None}}
+    if question_1 is not None:
+        questions[str(question_1)] = {"score": 0, "comment": None}
+    return {"attempt": attempt, "fudge_points": None, "questions": questions}
+
+
+def put_quiz_scores(canvas, request_uri, entries):
+    """Update each attempt in entries, one request per attempt, in order
+
+    Canvas's quiz submissions update only applies quiz_submissions[0], so
+    attempts can't share a request.  Returns the number of requests sent.
+    """
+    for entry in entries:
+        response = canvas.put(request_uri,
+                              json={'quiz_submissions': [entry]})
+        response.raise_for_status()
+    return len(entries)
+
+
+class StudentReport(pipeline.StudentReport):
+    """Output and outcome of one student's grade and comment"""
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        # filled in by parse_student()
+        self.comment = None
+        self.score = None
+        self.sid = None
+
+
+def parse_student(args, config, score_column, this_xlsx_filename):
+    """Parse stage: render the comment and find the score of one xlsx file (runs in a worker process)"""
+    report = StudentReport(this_xlsx_filename)
+    report.out(f'--Working on {this_xlsx_filename}')
+    ##
+    # render the spreadsheet as csv text for the comment
+    try:
+        this_rows = read_rows(this_xlsx_filename)
+        report.comment = render_csv(this_rows)
+    except Exception as err:
+        report.fail(f'* Cannot make csv comment for [{this_xlsx_filename}]\n   {str(err)}')
+        return report
+
+    report.out(f'  comment is {len(report.comment.encode())} bytes')
+
+    ##
+    # extract score from xlsx file
+    try:
+        score = find_score(this_rows, 'Score', score_column)
+        assert score is not None, f'No "Score" row with a {score_column} value'
+        report.out(f'Score is {score}')
+        if 'factor' in config.keys():
+            score = score*config['factor']
+        report.score = score
+    except Exception as err:
+        report.fail(f'* Score not found for [{this_xlsx_filename}]\n   {str(err)}')
+        return report
+
+    # grab Canvas student ID from filename
+    try:
+        report.sid = this_xlsx_filename.split(',')[1].split('.')[0]
+    except Exception as err:
+        report.fail(f'* No student id in [{this_xlsx_filename}]\n   {str(err)}')
+        return report
+    if args.debug:
+        report.out(f'**student_canvas_id: {report.sid}')
+    return report
+
+
+def submit_student(canvas, args, submissions, assignment_uri, submissions_uri, questions, report):
+    """Network stage: post one parsed student's comment and quiz grade"""
+    if report.status != 'succeeded':
+        return report
+    try:
+        upload_student(canvas, args, submissions, assignment_uri, submissions_uri, questions, report)
+    except Exception as err:
+        report.fail(f'* Unexpected failure for [{report.filename}]\n   {str(err)}')
+    return report
+
+
+def upload_student(canvas, args, submissions, assignment_uri, submissions_uri, questions, report):
+    this_xlsx_filename = report.filename
+    (question_0, question_1) = questions
+
+    ##
+    # upload comments
+    comment_upload_uri = f'{assignment_uri}/submissions/{report.sid}'
+    if args.debug:
+        report.out(f'**comment_upload_uri: {comment_upload_uri}')
+        report.out(f'**comment[text_comment]: {report.comment}')
+
+    if not args.n:
+        comment_response = None
+        try:
+            # in the body: long comments don't fit in a URL; not retried, a
+            # retry after Canvas added the comment would add it twice
+            comment_response = canvas.put(comment_upload_uri,
+                                          data={'comment[text_comment]': report.comment},
+                                          idempotent=False)
+            comment_response.raise_for_status()
+        except Exception as err:
+            report.fail(f'* Could not attach comment [{comment_response.text if comment_response is not None else None}]\n   {str(err)}')
+            return
+
+    ##
+    # find student id in submissions
+    try:
+        last_entry = submissions[int(report.sid)]
+    except Exception as err:
+        report.fail(f'* Could not find quiz entry for {this_xlsx_filename}\n   {str(err)}')
+        return
+
+    submission_id = last_entry["id"]
+    attempt = last_entry["attempt"]
+    if args.debug:
+        report.out(f'**submission_id: {str(submission_id)}, attempt is {str(attempt)}')
+
+    ##
+    # post grade
+    # Set all earlier attempts to 0 (to insure only one grade prevails
+    # just in case use highest grade is set.
+    # This is something people might want to change.
+    # The latest attempt goes last, so its score is the one that prevails.
+    entries = [attempt_scores(this_attempt,
+                              float(report.score) if this_attempt == attempt else 0.0,
+                              question_0,
+                              question_1)
+               for this_attempt in range(1, attempt + 1)]
+    request_uri = submissions_uri + '/' + str(submission_id)
+
+    if args.debug:
+        report.out(f'**request_uri {request_uri}\n**arg: {entries}')
+    if not args.n:
+        try:
+            requests_sent = put_quiz_scores(canvas, request_uri, entries)
+            report.out(f'Uploaded grade for {this_xlsx_filename}'
+                       f' ({attempt} attempts, {requests_sent} requests)')
+        except Exception as err:
+            report.fail(f'**http request failed {request_uri}\n   {str(err)}')
+    else:
+        report.out(f'No action for {this_xlsx_filename}')
+
+
+def main():
+    access_token = None
+    assignment_id = None
+    asst_entry = None
+    config = None
+    question_1 = None
+    score_column = 'Deductions'
+
+    parser = argparse.ArgumentParser(description='Copy Rubric to student files')
+    parser.add_argument('--config',
+                        help='file containing config info',
+                        default=None)
+
+    parser.add_argument('--token',
+                        help='Canvas Access Token File',
+                        default='../API_token')
+
+    parser.add_argument('--canvas_url',
+                        help='Canvas base URL (default: config "canvas_url" or https://ufl.instructure.com)',
+                        default=None)
+
+    parser.add_argument('--jobs',
+                        help='Number of students to post concurrently (default: 4)',
+                        type=int,
+                        default=4)
+    parser.add_argument('--parse_jobs',
+                        help='Number of processes reading xlsx files (default: one per CPU)',
+                        type=int,
+                        default=None)
+    parser.add_argument('--no-cache', '-no_cache',
+                        dest='no_cache',
+                        help='Ignore the on-disk Canvas metadata cache',
+                        action='store_true')
+    parser.add_argument('-debug',
+                        help='Set verbose debugging mode',
+                        action='store_true')
+    parser.add_argument('-force',
+                        help='Perform action without user acknowledgement',
+                        action='store_true')
+    parser.add_argument('-n',
+                        help='Dry run: do everything but submit grades',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    ##
+    # read config file
+    #
+    # json config file example
+    #
+    # {"software_version": 0.2,
+    #  "exercise_name": "Ex210:Nonexistent Exercise",
+    #  "score_column": "Total",
+    #  "course_id": 3482356,
+    #  "quiz_id": 03823646}
+
+    ##
+    # grab config filename if not set
+
+    if not args.config:
+        config_file = fnmatch.filter(os.listdir('.'), 'config*')
+        assert not (len(config_file) < 1), 'No config file!'
+        assert not (len(config_file) > 1), f'Too many config files:{config_file}'
+        config_file = config_file[0]
+    else:
+        config_file = args.config
+
+    try:
+        with open(config_file) as f:
+            config = json.load(f)
+    except Exception as err:
+        print(f'Unable to open or parse config file: [{config_file}]: {str(err)}',
+              file=sys.stderr,
+              flush=True)
+        exit(1)
+
+    ##
+    # check software version
+
+    config_software_version = config['software_version']
+    assert Software_Version >= config_software_version, \
+        f'Software version ({str(Software_Version)}) too low. ' \
+        f'Config file requires {str(config_software_version)}'
+
+    ##
+    # read score column from config
+    if 'score_column' in config.keys():
+        score_column = config["score_column"]
+
+    ##
+    # read Canvas token from file
+    try:
+        access_token = read_token(args.token)
+    except Exception as err:
+        print(f"Couldn't read access token file {args.token}\n   {str(err)}",
+              file=sys.stderr,
+              flush=True)
+        exit(2)
+
+    canvas = CanvasClient(access_token, base_url=resolve_base_url(args.canvas_url, config),
+                          cache=None if args.no_cache else ResponseCache())
+
+    quiz_uri = canvas.api_base + 'courses/' + \
+        str(config['course_id']) + '/quizzes/' + \
+        str(config['quiz_id'])
+
+    ##
+    # get info on quiz questions
+    questions_uri = quiz_uri + '/questions'
+
+    Only_one_question = False
+    questions = list(canvas.paginate(questions_uri))
+    question_0 = questions[0]["id"]
+    try:
+        question_1 = questions[1]["id"]
+    except:
+        Only_one_question = True
+
+
+    ##
+    # get quiz submissions
+    submissions_uri = quiz_uri + '/submissions'
+
+    submissions = index_quiz_submissions(canvas.paginate(submissions_uri, key='quiz_submissions'))
+
+    ##
+    # find assignment id
+    assignments_uri = canvas.api_base + 'courses/' + \
+                      str(config['course_id']) + '/assignments/'
+    try:
+        if args.debug:
+            print(f'config["quiz_id"] is {config["quiz_id"]}',
+                  flush=True)
+        asst_entry = list(filter(lambda x: 'quiz_id' in x and x['quiz_id'] == config['quiz_id'],
+                                 canvas.paginate(assignments_uri)))
+        assignment_id = asst_entry[0]["id"]
+    except Exception as err:
+        print(f'* Could not find assignment for quiz {config["quiz_id"]}\n   {str(err)}',
+              file=sys.stderr,
+              flush=True)
+        exit(254)
+
+    ##
+    # Get verification of correct exercise
+
+    exercise_name = asst_entry[0]['name']
+    config_name = config['exercise_name']
+    if not args.force:
+        if input(f'\nExercise name is: {exercise_name}\nConfigured name:  '
+                 f'{config_name}\n\nDo you want to continue? [y/n] ') != 'y':
+            exit(1)
+
+    ##
+    # post each student's xlsx grade file as a csv text comment
+    # and upload student grade
+
+    excel_files = sorted(fnmatch.filter(os.listdir('.'), '*[0-9]*.xlsx'))
+
+    ##
+    # the spreadsheets are parsed in a process pool while the students
+    # parsed so far are posted (see pipeline.py)
+    questions = (question_0, None if Only_one_question else question_1)
+    assignment_uri = f'{assignments_uri}{str(assignment_id)}'
+    stage_stats = []
+    failed = []
+    for report in pipeline.run_pipeline(excel_files,
+                                        partial(parse_student, args, config, score_column),
+                                        lambda report: submit_student(canvas, args, submissions, assignment_uri,
+                                                                      submissions_uri, questions, report),
+                                        parse_jobs=args.parse_jobs,
+                                        network_jobs=args.jobs,
+                                        stats=stage_stats):
+        report.print()
+        if report.status != 'succeeded':
+            failed.append(report.filename)
+
+    print(f'\n{len(excel_files)} students: {len(excel_files) - len(failed)} succeeded, {len(failed)} failed',
+          flush=True)
+    for this_xlsx_filename in failed:
+        print(f'  failed: {this_xlsx_filename}',
+              flush=True)
+    for stats in stage_stats:
+        print(f'  {stats.summary()}',
+              flush=True)
+
+    if args.n:
+        print('No upload actions actually performed',
+              flush=True)
+
+
+if __name__ == '__main__':
+    main()
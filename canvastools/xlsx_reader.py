@@ -0,0 +1,241 @@
+#! /usr/bin/env python3
+"""
+xlsx_reader.py
+
+Minimal reader for the grading spreadsheets.
+
+    pandas.read_excel parses every cell of the workbook into a DataFrame
+    (and importing pandas/openpyxl costs seconds on its own) just so the
+    scripts can look up one score cell.  This module streams the first
+    worksheet's XML straight out of the xlsx zip with the standard library:
+
+        read_score(filename, score_label, score_column)
+            The value in column score_column (by first-row header) of the
+            first row whose first cell is score_label; stops reading there.
+
+        read_rows(filename)
+            Every row of the sheet (header included) as a list of values.
+
+        find_score(rows, score_label, score_column)
+            read_score for rows that have already been read.
+
+        render_csv(rows)
+            The rows as csv text with empty rows and columns trimmed, for
+            posting the spreadsheet as a text comment.
+
+    Cells hold what Excel last saved: numbers, strings, booleans, or the
+    cached result of a formula.  Empty cells are None.
+
+    Run this file directly to benchmark it against pandas.read_excel:
+
+        xlsx_reader.py [--score_label Score] [--score_column Deductions] *.xlsx
+
+"""
+import sys
+import argparse
+import csv
+import fnmatch
+import io
+import os
+import posixpath
+import re
+import time
+import zipfile
+from xml.etree.ElementTree import iterparse, parse
+
+Main_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+Rel_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+Package_Rel_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+Cell_Ref = re.compile(r'([A-Z]+)(\d*)')
+
+
+def column_index(cell_ref):
+    """0-based column of a cell reference such as 'AB12'"""
+    index = 0
+    for letter in Cell_Ref.match(cell_ref).group(1):
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def first_sheet_path(xlsx):
+    """Zip member name of the first worksheet in workbook order"""
+    workbook = parse(xlsx.open('xl/workbook.xml')).getroot()
+    sheet = workbook.find(f'{Main_NS}sheets/{Main_NS}sheet')
+    rel_id = sheet.get(f'{Rel_NS}id')
+    rels = parse(xlsx.open('xl/_rels/workbook.xml.rels')).getroot()
+    for rel in rels.iter(f'{Package_Rel_NS}Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    raise KeyError(f'worksheet relationship {rel_id} not found')
+
+
+def shared_strings(xlsx):
+    """Shared string table (empty if the workbook has none)"""
+    try:
+        stream = xlsx.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    for (_, elem) in iterparse(stream):
+        if elem.tag == f'{Main_NS}si':
+            # rich text is split over several <t> runs
+            strings.append(''.join(t.text or '' for t in elem.iter(f'{Main_NS}t')))
+            elem.clear()
+    return strings
+
+
+def cell_value(cell, strings):
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        return ''.join(t.text or '' for t in cell.iter(f'{Main_NS}t'))
+    value = cell.find(f'{Main_NS}v')
+    if value is None or value.text is None:
+        return None
+    text = value.text
+    if cell_type == 's':
+        return strings[int(text)]
+    if cell_type == 'b':
+        return text == '1'
+    if cell_type in ('str', 'e'):
+        return text
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def iter_rows(filename):
+    """Yield each row of the first worksheet as a list of cell values"""
+    with zipfile.ZipFile(filename) as xlsx:
+        strings = shared_strings(xlsx)
+        with xlsx.open(first_sheet_path(xlsx)) as sheet:
+            for (_, elem) in iterparse(sheet):
+                if elem.tag != f'{Main_NS}row':
+                    continue
+                row = []
+                for cell in elem.iter(f'{Main_NS}c'):
+                    ref = cell.get('r')
+                    index = column_index(ref) if ref else len(row)
+                    row.extend([None] * (index - len(row)))
+                    row.append(cell_value(cell, strings))
+                elem.clear()
+                yield row
+
+
+def read_rows(filename):
+    """All rows of the first worksheet, header row first"""
+    return list(iter_rows(filename))
+
+
+def find_score(rows, score_label='Score', score_column='Deductions'):
+    """Score cell among rows (header row first), or None if there is no such row, column or value"""
+    rows = iter(rows)
+    header = [str(name) if name is not None else None for name in next(rows, [])]
+    if score_column not in header:
+        return None
+    column = header.index(score_column)
+    for row in rows:
+        if row and row[0] == score_label:
+            return row[column] if column < len(row) else None
+    return None
+
+
+def read_score(filename, score_label='Score', score_column='Deductions'):
+    """Score cell of a grading spreadsheet, reading no further than the score row"""
+    rows = iter_rows(filename)
+    try:
+        return find_score(rows, score_label, score_column)
+    finally:
+        rows.close()
+
+
+def render_csv(rows):
+    """rows as csv text, without rows or columns that are entirely empty"""
+    def empty(value):
+        return value is None or value == ''
+
+    rows = [row for row in rows if not all(empty(value) for value in row)]
+    width = max((len(row) for row in rows), default=0)
+    columns = [column for column in range(width)
+               if not all(column >= len(row) or empty(row[column]) for row in rows)]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in rows:
+        writer.writerow(['' if column >= len(row) or row[column] is None else row[column]
+                         for column in columns])
+    return buffer.getvalue()
+
+
+def read_score_pandas(filename, score_label='Score', score_column='Deductions'):
+    """The pandas.read_excel lookup the scripts used to do, for the benchmark"""
+    import pandas
+    this_xlsx = pandas.read_excel(filename)
+    score = None
+    for row_ind in range(len(this_xlsx) - 1, -1, -1):
+        if this_xlsx.at[row_ind, list(this_xlsx)[0]] == score_label:
+            score = this_xlsx.at[row_ind, score_column]
+    return score
+
+
+def same_score(fast, slow):
+    """True if read_score and read_score_pandas agree (pandas has NaN for an empty cell)"""
+    if isinstance(fast, Exception) or isinstance(slow, Exception):
+        return False
+    if isinstance(slow, float) and slow != slow:
+        slow = None
+    return fast == slow
+
+
+def describe(result):
+    return f'{type(result).__name__}: {result}' if isinstance(result, Exception) else result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark xlsx_reader against pandas.read_excel')
+    parser.add_argument('--score_label',
+                        help='row header of the score row (default: Score)',
+                        default='Score')
+    parser.add_argument('--score_column',
+                        help='column header of the score column (default: Deductions)',
+                        default='Deductions')
+    parser.add_argument('files',
+                        help='xlsx files to read (default: ./*-*.xlsx)',
+                        nargs='*')
+    args = parser.parse_args()
+
+    files = args.files or sorted(fnmatch.filter(os.listdir('.'), '*-*.xlsx'))
+    if not files:
+        print('No xlsx files to benchmark',
+              file=sys.stderr,
+              flush=True)
+        exit(1)
+
+    results = {}
+    for (name, reader) in (('xlsx_reader', read_score), ('pandas', read_score_pandas)):
+        start = time.perf_counter()
+        results[name] = []
+        for filename in files:
+            # a file either reader can't read is one more difference
+            try:
+                results[name].append(reader(filename, args.score_label, args.score_column))
+            except Exception as err:
+                results[name].append(err)
+        elapsed = time.perf_counter() - start
+        print(f'{name:12} {len(files)} files in {elapsed:.3f}s '
+              f'({1000 * elapsed / len(files):.2f} ms/file, including imports)',
+              flush=True)
+
+    for (filename, fast, slow) in zip(files, results['xlsx_reader'], results['pandas']):
+        if not same_score(fast, slow):
+            print(f'* Scores differ for [{filename}]: xlsx_reader {describe(fast)}, pandas {describe(slow)}',
+                  file=sys.stderr,
+                  flush=True)
+
+
+if __name__ == '__main__':
+    main()
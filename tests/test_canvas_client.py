@@ -0,0 +1,56 @@
+"""CanvasClient retries and timeouts (see canvas_client.py)"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from canvastools import canvas_client
+from canvastools.canvas_client import CanvasClient
+
+
+class FlakyCanvas(BaseHTTPRequestHandler):
+    """502 for the first request to each path, then 200; /stall never answers in time"""
+    seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_PUT(self):
+        FlakyCanvas.seen.append(self.path)
+        if self.path.startswith('/api/v1/stall'):
+            time.sleep(1)
+        status = 502 if FlakyCanvas.seen.count(self.path) == 1 else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+
+@pytest.fixture
+def canvas(monkeypatch):
+    monkeypatch.setattr(canvas_client, 'backoff_delay', lambda retry, response=None: 0)
+    FlakyCanvas.seen.clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyCanvas)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with CanvasClient('token', base_url=f'http://127.0.0.1:{server.server_port}') as client:
+        yield client
+    server.shutdown()
+    server.server_close()
+
+
+def test_put_is_retried_after_5xx(canvas):
+    assert canvas.put('grade', params={'submission[posted_grade]': '7'}).status_code == 200
+    assert len(FlakyCanvas.seen) == 2
+
+
+def test_non_idempotent_put_is_not_retried(canvas):
+    assert canvas.put('comment', params={'comment[text_comment]': 'hi'}, idempotent=False).status_code == 502
+    assert len(FlakyCanvas.seen) == 1
+
+
+def test_stalled_request_times_out(canvas):
+    with pytest.raises(requests.Timeout):
+        canvas.put('stall', timeout=(1, 0.1), idempotent=False)
+    assert len(FlakyCanvas.seen) == 1
@@ -0,0 +1,283 @@
+"""RestBackend and GraphQLBackend against a stub Canvas (see canvas_data.py)"""
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import pytest
+
+from canvastools.canvas_client import CanvasClient
+from canvastools.canvas_data import GraphQLBackend, RestBackend, size_matches
+
+Rest_Page = 4
+GraphQL_Page = {'assignments': 2, 'submissions': 3}
+
+Courses = {
+    '555': [{'id': 77, 'name': 'Ex1', 'quiz_id': 42},
+            {'id': 78, 'name': 'Ex2'},
+            {'id': 79, 'name': 'Ex3'},
+            {'id': 80, 'name': 'Ex4', 'quiz_id': 43},
+            {'id': 81, 'name': 'Ex5'}],
+    '556': [{'id': 90, 'name': 'Ex1 (section 2)', 'quiz_id': 42}],
+}
+
+
+def make_submission(n):
+    submitted = n % 4 != 0
+    return {'id': 5000 + n,
+            'user_id': 1000 + n,
+            'attempt': 1 + n % 2 if submitted else None,
+            'workflow_state': ('graded' if n % 3 == 0 else 'submitted') if submitted else 'unsubmitted',
+            'submitted_at': f'2026-10-{1 + n:02d}T12:00:00Z' if submitted else None,
+            'score': 7.5 if n % 3 == 0 else None,
+            'entered_score': 7.5 if n % 3 == 0 else None,
+            'grade_matches_current_submission': True,
+            'user': {'id': 1000 + n, 'sortable_name': f'Student{n:02d}, Pat'},
+            # a comment file on every attempt graded so far
+            'submission_comments': [{'attempt': attempt,
+                                     'attachments': [{'id': 9000 + 10 * n + attempt,
+                                                      'display_name': f'Student{n:02d}-Pat-{1000 + n}-{5000 + n}.xlsx',
+                                                      'size': 2000 + 100 * n + attempt}]}
+                                    for attempt in range(1, 1 + 1 + n % 2)] if n % 3 == 0 and submitted else []}
+
+
+Submissions = {77: [make_submission(n) for n in range(11)],
+               90: [make_submission(n) for n in range(20, 23)]}
+
+
+def without(record, *keys):
+    return {key: value for (key, value) in record.items() if key not in keys}
+
+
+def human_size(size):
+    """File.size the way Canvas GraphQL gives it (number_to_human_size)"""
+    if size < 1024:
+        return f'{size} Bytes'
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024:
+            break
+    return f'{size:.3g} {unit}'
+
+
+def graphql_sizes(record):
+    """record with its attachment sizes as GraphQL reports them"""
+    return dict(record, submission_comments=[
+        dict(comment, attachments=[dict(attachment, size=human_size(attachment['size']))
+                                   for attachment in comment['attachments']])
+        for comment in record['submission_comments']])
+
+
+def graphql_submission(record, all_comments):
+    node = {'_id': str(record['id']),
+            'userId': str(record['user_id']),
+            'attempt': record['attempt'] or 0,
+            'state': record['workflow_state'],
+            'submittedAt': record['submitted_at'],
+            'score': record['score'],
+            'enteredScore': record['entered_score'],
+            'gradeMatchesCurrentSubmission': record['grade_matches_current_submission'],
+            'user': {'_id': str(record['user']['id']), 'sortableName': record['user']['sortable_name']},
+            'commentsConnection': {'nodes': [
+                {'attempt': comment['attempt'],
+                 'attachments': [{'_id': str(attachment['id']),
+                                  'displayName': attachment['display_name'],
+                                  'size': human_size(attachment['size'])}
+                                 for attachment in comment['attachments']]}
+                # without allComments only the current attempt's comments
+                for comment in record['submission_comments']
+                if all_comments or comment['attempt'] == record['attempt']]}}
+    return node
+
+
+def graphql_assignment(record):
+    return {'_id': str(record['id']), 'name': record['name'],
+            'quiz': {'_id': str(record['quiz_id'])} if 'quiz_id' in record else None}
+
+
+def connection(nodes, after, size):
+    start = int(after) if after else 0
+    return {'nodes': nodes[start:start + size],
+            'pageInfo': {'hasNextPage': start + size < len(nodes), 'endCursor': str(start + size)}}
+
+
+class StubCanvas(BaseHTTPRequestHandler):
+    queries = []
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for (name, value) in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if m := re.fullmatch(r'/api/v1/courses/(\d+)/assignments', url.path):
+            records = Courses[m[1]]
+        elif m := re.fullmatch(r'/api/v1/courses/(\d+)/assignments/(\d+)/submissions', url.path):
+            records = [without(record, 'submission_comments') for record in Submissions[int(m[2])]]
+        elif re.fullmatch(r'/api/v1/courses/(\d+)/students/submissions', url.path):
+            records = Submissions[int(query['assignment_ids[]'][0])]
+            if 'submitted_since' in query:
+                since = query['submitted_since'][0]
+                records = [record for record in records
+                           if record['submitted_at'] is not None and record['submitted_at'] >= since]
+            includes = query.get('include[]', [])
+            records = [without(record, *[key for key in ('user', 'submission_comments') if key not in includes])
+                       for record in records]
+        else:
+            self.send_error(404)
+            return
+        page = int(query.get('page', ['1'])[0])
+        last = max(1, -(-len(records) // Rest_Page))
+
+        def link(n, rel):
+            return f'<http://{self.headers["Host"]}{url.path}?{urlencode(dict(query, page=n), doseq=True)}>; rel="{rel}"'
+
+        links = [link(last, 'last')] + ([link(page + 1, 'next')] if page < last else [])
+        self.reply(records[(page - 1) * Rest_Page:page * Rest_Page], [('Link', ', '.join(links))])
+
+    def do_POST(self):
+        if self.path != '/api/graphql':
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        query, variables = request['query'], request['variables']
+        operation = re.search(r'query (\w+)', query)[1]
+        StubCanvas.queries.append((operation, variables))
+        if variables.get('courseId') == 'error' or variables.get('c0') == 'error':
+            self.reply({'data': None, 'errors': [{'message': 'not authorized'}]})
+        elif operation == 'BatchAssignments':
+            self.reply({'data': {name: self.course(course_id, None) for (name, course_id) in variables.items()}})
+        elif operation == 'Assignments':
+            self.reply({'data': {'course': self.course(variables['courseId'], variables['after'])}})
+        elif operation == 'Submissions':
+            self.reply({'data': {'assignment': self.assignment(variables, 'allComments: true' in query)}})
+        else:
+            self.send_error(400)
+
+    def course(self, course_id, after):
+        if course_id not in Courses:
+            return None
+        nodes = [graphql_assignment(record) for record in Courses[course_id]]
+        return {'assignmentsConnection': connection(nodes, after, GraphQL_Page['assignments'])}
+
+    def assignment(self, variables, all_comments):
+        if int(variables['assignmentId']) not in Submissions:
+            return None
+        nodes = [graphql_submission(record, all_comments) for record in Submissions[int(variables['assignmentId'])]]
+        for node in nodes:
+            if not variables['withUser']:
+                del node['user']
+            if not variables['withComments']:
+                del node['commentsConnection']
+        return {'submissionsConnection': connection(nodes, variables['after'], GraphQL_Page['submissions'])}
+
+
+@pytest.fixture(scope='module')
+def canvas():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubCanvas)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield CanvasClient('token', base_url=f'http://127.0.0.1:{server.server_port}')
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backends(canvas):
+    StubCanvas.queries.clear()
+    return RestBackend(canvas), GraphQLBackend(canvas)
+
+
+def test_find_assignments_match(backends):
+    rest, graphql = backends
+    wanted = {555: 43, 556: 42}
+    expected = {555: Courses['555'][3], 556: Courses['556'][0]}
+    assert rest.find_assignments(wanted) == expected
+    assert graphql.find_assignments(wanted) == expected
+
+
+def test_find_assignments_follows_cursors(backends):
+    _, graphql = backends
+    # course 555 has 5 assignments, 2 per page: the batch plus 2 more pages
+    assert graphql.find_assignments({555: 81, 556: 90}) == {555: {'id': 81, 'name': 'Ex5'},
+                                                            556: Courses['556'][0]}
+    operations = [operation for (operation, _) in StubCanvas.queries]
+    assert operations == ['BatchAssignments', 'Assignments', 'Assignments']
+    assert [variables['after'] for (_, variables) in StubCanvas.queries[1:]] == ['2', '4']
+
+
+def test_roster_matches(backends):
+    rest, graphql = backends
+    expected = [without(record, 'submission_comments') for record in Submissions[77]]
+    assert rest.roster(555, 77) == expected
+    assert graphql.roster(555, 77) == expected
+    # 11 submissions, 3 per page
+    assert len([operation for (operation, _) in StubCanvas.queries if operation == 'Submissions']) == 4
+
+
+def test_roster_submitted_since_matches(backends):
+    rest, graphql = backends
+    since = '2026-10-06T00:00:00Z'
+    expected = [without(record, 'submission_comments') for record in Submissions[77]
+                if record['submitted_at'] is not None and record['submitted_at'] >= since]
+    assert [record['id'] for record in expected] == [5005, 5006, 5007, 5009, 5010]
+    assert rest.roster(555, 77, submitted_since=since) == expected
+    assert graphql.roster(555, 77, submitted_since=since) == expected
+
+
+def test_submissions_match(backends):
+    rest, graphql = backends
+    expected = [without(record, 'user') for record in Submissions[77]]
+    assert sum(len(record['submission_comments']) for record in expected) == 5
+    assert rest.submissions(555, 77) == expected
+    # the same comments of every attempt, but sizes as text
+    assert graphql.submissions(555, 77) == [graphql_sizes(record) for record in expected]
+
+
+def test_size_matches():
+    assert size_matches(2048, 2048)
+    assert not size_matches(2048, 2049)
+    assert size_matches('2 KB', 2050)
+    assert not size_matches('2 KB', 2200)
+    assert size_matches('12.5 KB', 12800)
+    assert not size_matches('12.5 KB', 12900)
+    assert size_matches('512 Bytes', 512)
+    assert size_matches('1.25 MB', 1310720)
+    assert not size_matches(None, 0)
+    for submission in Submissions[77]:
+        for comment in submission['submission_comments']:
+            for attachment in comment['attachments']:
+                assert size_matches(human_size(attachment['size']), attachment['size'])
+
+
+def test_graphql_errors_raise(backends):
+    _, graphql = backends
+    with pytest.raises(RuntimeError, match='not authorized'):
+        graphql.find_assignments({'error': 42})
+
+
+def test_null_course_raises(backends):
+    _, graphql = backends
+    with pytest.raises(RuntimeError, match='no course 404'):
+        graphql.find_assignments({404: 42})
+    with pytest.raises(RuntimeError, match='no course'):
+        list(graphql.connection(
+            'query Assignments($courseId: ID!, $after: String) { course(id: $courseId) { id } }',
+            {'courseId': '404'}, ('course', 'assignmentsConnection')))
+
+
+def test_null_assignment_raises(backends):
+    _, graphql = backends
+    with pytest.raises(RuntimeError, match='no assignment'):
+        graphql.roster(555, 404)
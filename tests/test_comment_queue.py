@@ -0,0 +1,71 @@
+"""CommentQueue persistence (see comment_upload.py)"""
+import json
+import os
+
+import pytest
+
+from canvastools.comment_upload import CommentQueue, Queue_File
+from canvastools.journal import SubmissionJournal, file_sha256
+
+
+class FakeUploader:
+    def __init__(self):
+        self.uploaded = []
+
+    def prepare(self, comment_upload_uri, filename):
+        return None
+
+    def upload(self, comment_upload_uri, filename, upload_rq=None, report=None):
+        self.uploaded.append(filename)
+        return 1000 + len(self.uploaded)
+
+
+@pytest.fixture
+def assignment_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open('Doe-Jane-1000-555.xlsx', 'wb') as f:
+        f.write(b'graded')
+    return tmp_path
+
+
+def write_queue(*records):
+    with open(Queue_File, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def test_done_record_only_clears_its_own_upload(assignment_dir):
+    # saved again while uploading: the first upload's done must not clear the second
+    write_queue({'filename': 'Doe-Jane-1000-555.xlsx', 'comment_upload_uri': 'u', 'id': 'first'},
+                {'filename': 'Doe-Jane-1000-555.xlsx', 'comment_upload_uri': 'u', 'id': 'second'},
+                {'filename': 'Doe-Jane-1000-555.xlsx', 'id': 'first', 'done': True})
+    queue = CommentQueue(FakeUploader(), SubmissionJournal())
+    assert len(queue) == 1
+    assert queue.pending['Doe-Jane-1000-555.xlsx'].record_id == 'second'
+
+
+def test_upload_recorded_in_journal_is_not_requeued(assignment_dir):
+    # the run died after journal.record() but before the done record
+    write_queue({'filename': 'Doe-Jane-1000-555.xlsx', 'comment_upload_uri': 'u', 'id': 'first'})
+    journal = SubmissionJournal()
+    journal.record('Doe-Jane-1000-555.xlsx', sha256=file_sha256('Doe-Jane-1000-555.xlsx'), file_id=1001)
+    uploader = FakeUploader()
+    queue = CommentQueue(uploader, journal)
+    assert len(queue) == 0
+    queue.start()
+    queue.close()
+    assert uploader.uploaded == []
+    assert not os.path.exists(Queue_File)
+
+
+def test_interrupted_queue_resumes(assignment_dir):
+    journal = SubmissionJournal()
+    CommentQueue(FakeUploader(), journal).put('Doe-Jane-1000-555.xlsx', 'u')
+    uploader = FakeUploader()
+    queue = CommentQueue(uploader, journal)
+    assert len(queue) == 1
+    queue.start()
+    queue.close()
+    assert uploader.uploaded == ['Doe-Jane-1000-555.xlsx']
+    assert journal.comment_uploaded('Doe-Jane-1000-555.xlsx', file_sha256('Doe-Jane-1000-555.xlsx'))
+    assert not os.path.exists(Queue_File)
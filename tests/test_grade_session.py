@@ -0,0 +1,44 @@
+"""Waiting for a running LibreOffice to close the file (see grade_session.py)"""
+import os
+import threading
+import time
+
+from canvastools.grade_session import libreoffice_lock, wait_until_closed
+
+Filename = 'Doe-Jane-1000-555.xlsx'
+
+
+def test_waits_for_the_lock_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    lock = libreoffice_lock(Filename)
+    assert lock == '.~lock.Doe-Jane-1000-555.xlsx#'
+
+    def libreoffice():
+        # opens the file a little after the command returned, closes it later
+        time.sleep(0.1)
+        open(lock, 'w').close()
+        time.sleep(0.3)
+        os.remove(lock)
+
+    thread = threading.Thread(target=libreoffice)
+    start = time.monotonic()
+    thread.start()
+    wait_until_closed(Filename, 0.0, appear=2, poll=0.02)
+    assert time.monotonic() - start >= 0.4
+    assert not os.path.exists(lock)
+    thread.join()
+
+
+def test_no_wait_after_a_blocking_editor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    open(libreoffice_lock(Filename), 'w').close()
+    start = time.monotonic()
+    wait_until_closed(Filename, 60.0)
+    assert time.monotonic() - start < 0.1
+
+
+def test_no_lock_no_wait_past_appear(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    start = time.monotonic()
+    wait_until_closed(Filename, 0.0, appear=0.2, poll=0.02)
+    assert time.monotonic() - start < 1
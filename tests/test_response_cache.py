@@ -0,0 +1,53 @@
+"""Cached GETs are revalidated by ETag (see response_cache.py)"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from canvastools.canvas_client import CanvasClient
+from canvastools.response_cache import ResponseCache
+
+
+class AssignmentsCanvas(BaseHTTPRequestHandler):
+    assignments = []
+    not_modified = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        etag = f'"{len(AssignmentsCanvas.assignments)}"'
+        if self.headers.get('If-None-Match') == etag:
+            AssignmentsCanvas.not_modified += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        data = json.dumps(AssignmentsCanvas.assignments).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def canvas(tmp_path):
+    AssignmentsCanvas.assignments = [{'id': 77, 'name': 'Ex1'}]
+    AssignmentsCanvas.not_modified = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), AssignmentsCanvas)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with CanvasClient('token', base_url=f'http://127.0.0.1:{server.server_port}',
+                      cache=ResponseCache(str(tmp_path))) as client:
+        yield client
+    server.shutdown()
+    server.server_close()
+
+
+def test_new_assignment_is_seen(canvas):
+    assert [a['id'] for a in canvas.paginate('courses/555/assignments')] == [77]
+    assert [a['id'] for a in canvas.paginate('courses/555/assignments')] == [77]
+    assert AssignmentsCanvas.not_modified == 1
+    AssignmentsCanvas.assignments.append({'id': 78, 'name': 'Ex2'})
+    assert [a['id'] for a in canvas.paginate('courses/555/assignments')] == [77, 78]
@@ -0,0 +1,10 @@
+"""canvastools <subcommand> --help stays within the startup budget (see startup_budget.py)"""
+import pytest
+
+from canvastools.cli import Subcommands
+from canvastools.startup_budget import Default_Budget_ms, check_subcommand
+
+
+@pytest.mark.parametrize('subcommand', sorted(Subcommands))
+def test_subcommand_startup(subcommand):
+    assert check_subcommand(subcommand, Default_Budget_ms) == []
@@ -0,0 +1,69 @@
+"""Comment files already on Canvas and -bulk grade checks (see submit_assignment.py)"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from canvastools.journal import SubmissionJournal
+from canvastools.submit_assignment import Course, StudentReport, attached_comment_file, post_course_grades
+
+Filename = 'Doe-Jane-1000-555.xlsx'
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(Filename, 'wb') as f:
+        f.write(b'x' * 12800)
+    return SubmissionJournal()
+
+
+def submission(size, file_id=9001):
+    return {'submission_comments': [{'attempt': 1,
+                                     'attachments': [{'id': file_id, 'display_name': Filename, 'size': size}]}]}
+
+
+@pytest.mark.parametrize('size', [12800, '12.5 KB'])
+def test_same_name_and_size_is_attached(journal, size):
+    # REST gives bytes, GraphQL a rounded text size
+    assert attached_comment_file(submission(size), Filename, 'sha', journal)['id'] == 9001
+
+
+@pytest.mark.parametrize('size', [12900, '12.6 KB', None])
+def test_other_size_is_not_attached(journal, size):
+    assert attached_comment_file(submission(size), Filename, 'sha', journal) is None
+
+
+def test_journal_rules_out_an_upload_of_other_content(journal):
+    journal.record(Filename, sha256='older', file_id=9001)
+    assert attached_comment_file(submission('12.5 KB'), Filename, 'sha', journal) is None
+
+
+class BulkCanvas:
+    """update_grades that completes but only applies the grades in applied"""
+
+    def __init__(self, applied):
+        self.applied = applied
+
+    def post(self, path, data=None):
+        return SimpleNamespace(raise_for_status=lambda: None, text=json.dumps({'workflow_state': 'queued'}))
+
+    def wait_for_progress(self, progress):
+        return {'workflow_state': 'completed'}
+
+    def submissions(self, course_id, assignment_id):
+        return [{'user_id': int(sid), 'entered_score': score, 'grade_matches_current_submission': True}
+                for (sid, score) in self.applied.items()]
+
+
+def test_bulk_grades_are_checked_per_student(journal):
+    canvas = BulkCanvas({'1000': 7.5, '1001': 3.0})
+    graded = []
+    for (sid, score) in (('1000', 7.5), ('1001', 9.0), ('1002', 5.0)):
+        report = StudentReport(f'Doe-Jane{sid}-{sid}-555.xlsx')
+        (report.sid, report.score) = (sid, score)
+        graded.append(report)
+    course = Course('555', {'id': 77}, 'http://canvas/api/v1/courses/555/assignments/77/submissions', {})
+    post_course_grades(canvas, canvas, SimpleNamespace(debug=False), journal, course, graded)
+    assert [report.status for report in graded] == ['succeeded', 'failed', 'failed']
+    assert [journal.lookup(report.filename).get('score') for report in graded] == [7.5, None, None]
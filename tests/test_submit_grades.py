@@ -0,0 +1,28 @@
+"""Quiz attempt scores (see submit_grades.py)"""
+from types import SimpleNamespace
+
+from canvastools.submit_grades import attempt_scores, index_quiz_submissions, put_quiz_scores
+
+
+class QuizCanvas:
+    def __init__(self):
+        self.sent = []
+
+    def put(self, path, json=None):
+        self.sent.append(json)
+        return SimpleNamespace(raise_for_status=lambda: None)
+
+
+def test_latest_attempt_is_indexed():
+    index = index_quiz_submissions([{'user_id': 1, 'attempt': 2, 'id': 'b'},
+                                    {'user_id': 1, 'attempt': 1, 'id': 'a'},
+                                    {'id': 'no user'}])
+    assert index == {1: {'user_id': 1, 'attempt': 2, 'id': 'b'}}
+
+
+def test_one_request_per_attempt_latest_last():
+    canvas = QuizCanvas()
+    entries = [attempt_scores(attempt, 7.5 if attempt == 3 else 0.0, 11) for attempt in (1, 2, 3)]
+    assert put_quiz_scores(canvas, 'quiz_submissions/5', entries) == 3
+    assert [request['quiz_submissions'] for request in canvas.sent] == [[entry] for entry in entries]
+    assert canvas.sent[-1]['quiz_submissions'][0]['questions'] == {'11': {'score': 7.5, 'comment': None}}
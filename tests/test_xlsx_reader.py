@@ -0,0 +1,124 @@
+"""xlsx_reader against pandas.read_excel on openpyxl-built workbooks (see xlsx_reader.py)"""
+import re
+import zipfile
+
+import pytest
+
+openpyxl = pytest.importorskip('openpyxl')
+pytest.importorskip('pandas')
+
+from canvastools.xlsx_reader import read_rows, read_score, read_score_pandas, same_score
+
+Shared_Strings_Type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'
+Shared_Strings_Rel = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings'
+
+Rubric = [['Item', None, None, 'Deductions'],
+          ['Part 1', 'late', None, 2],
+          [],
+          ['Part 2', None, None, 0.5],
+          ['Score', None, None, 7.5]]
+
+
+def build(path, rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for (n, row) in enumerate(rows, 1):
+        for (column, value) in enumerate(row, 1):
+            if value is not None:
+                sheet.cell(row=n, column=column, value=value)
+    workbook.save(path)
+    return path
+
+
+def rewrite(path, **transforms):
+    """Rewrite zip members of path: transforms maps member name to a function of its text"""
+    with zipfile.ZipFile(path) as xlsx:
+        members = {name: xlsx.read(name).decode() for name in xlsx.namelist()}
+    for (name, transform) in transforms.items():
+        members[name] = transform(members.get(name))
+    with zipfile.ZipFile(path, 'w') as xlsx:
+        for (name, text) in members.items():
+            xlsx.writestr(name, text)
+
+
+def to_shared_strings(path):
+    """Move the inline strings openpyxl writes into a shared string table, as Excel saves them"""
+    strings = []
+
+    def shared(m):
+        strings.append(m[2])
+        return f'<c r="{m[1]}" t="s"><v>{len(strings) - 1}</v></c>'
+
+    def sheet(text):
+        return re.sub(r'<c r="(\w+)" t="inlineStr"><is><t>(.*?)</t></is></c>', shared, text)
+
+    def table(_):
+        # the first string as rich text: two runs
+        items = [f'<si><r><t>{strings[0][:2]}</t></r><r><t>{strings[0][2:]}</t></r></si>'] + \
+            [f'<si><t>{string}</t></si>' for string in strings[1:]]
+        return f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">{"".join(items)}</sst>'
+
+    rewrite(path, **{'xl/worksheets/sheet1.xml': sheet})
+    rewrite(path, **{'xl/sharedStrings.xml': table,
+                     '[Content_Types].xml': lambda text: text.replace(
+                         '</Types>', f'<Override PartName="/xl/sharedStrings.xml" ContentType="{Shared_Strings_Type}"/></Types>'),
+                     'xl/_rels/workbook.xml.rels': lambda text: text.replace(
+                         '</Relationships>',
+                         f'<Relationship Id="rIdStrings" Type="{Shared_Strings_Rel}" Target="sharedStrings.xml"/></Relationships>')})
+    return path
+
+
+def assert_same(path, expected, score_label='Score', score_column='Deductions'):
+    score = read_score(str(path), score_label, score_column)
+    assert score == expected
+    assert same_score(score, read_score_pandas(str(path), score_label, score_column))
+
+
+def test_shared_strings(tmp_path):
+    path = to_shared_strings(build(tmp_path / 'shared.xlsx', Rubric))
+    with zipfile.ZipFile(path) as xlsx:
+        assert 't="s"' in xlsx.read('xl/worksheets/sheet1.xml').decode()
+    assert_same(path, 7.5)
+    assert read_rows(str(path))[0] == ['Item', None, None, 'Deductions']
+
+
+def test_inline_strings(tmp_path):
+    path = build(tmp_path / 'inline.xlsx', Rubric)
+    with zipfile.ZipFile(path) as xlsx:
+        assert 't="inlineStr"' in xlsx.read('xl/worksheets/sheet1.xml').decode()
+    assert_same(path, 7.5)
+
+
+def test_sparse_cell_references(tmp_path):
+    # only A and D are written, row 3 not at all: values go by their r= reference
+    path = build(tmp_path / 'sparse.xlsx', Rubric)
+    rows = read_rows(str(path))
+    assert rows[1] == ['Part 1', 'late', None, 2]
+    assert rows[3] == ['Score', None, None, 7.5]
+    assert_same(path, 7.5)
+
+
+def test_missing_label(tmp_path):
+    path = build(tmp_path / 'no_label.xlsx', Rubric[:-1])
+    assert_same(path, None)
+
+
+def test_missing_column(tmp_path):
+    path = build(tmp_path / 'no_column.xlsx', [['Item', None, None, 'Points']] + Rubric[1:])
+    assert read_score(str(path)) is None
+    # pandas has no such column at all
+    with pytest.raises(KeyError):
+        read_score_pandas(str(path))
+
+
+def test_empty_score_cell(tmp_path):
+    path = build(tmp_path / 'empty.xlsx', Rubric[:-1] + [['Score']])
+    assert_same(path, None)
+
+
+def test_cached_formula_value(tmp_path):
+    path = build(tmp_path / 'formula.xlsx', Rubric[:-1] + [['Score', None, None, '=10-D2-D4']])
+    # what Excel saves with the formula: its last result
+    rewrite(path, **{'xl/worksheets/sheet1.xml': lambda text: re.sub(
+        r'(<f>10-D2-D4</f>)<v\s*/>', r'\1<v>7.5</v>', text)})
+    assert_same(path, 7.5)